@@ -1,24 +1,65 @@
-from fastapi import FastAPI, HTTPException, Depends, WebSocket, WebSocketDisconnect, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Depends, WebSocket, WebSocketDisconnect, BackgroundTasks, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, Optional, Dict, Any, Set, Tuple
 from datetime import datetime, timedelta
-import json
+import orjson
 import asyncio
 import uuid
+import hashlib
+import os
+import time
+import queue
+import logging
+from logging.handlers import QueueHandler, QueueListener
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 import jwt
+import bcrypt
+from cachetools import TTLCache
+import redis.asyncio as aioredis
 from enum import Enum
+from collections import defaultdict
 import uvicorn
 
 from grid_trading_system import GridTradingSystem
 from exchange_manager import ExchangeManager
 from notification_manager import NotificationManager, NotificationType
 
+# Logging via een queue: handlers schrijven in een achtergrondthread,
+# zodat request handlers nooit op stdout/stderr I/O wachten.
+# Zet LOG_LEVEL=WARNING voor benchmarks.
+logger = logging.getLogger("api")
+logger.setLevel(os.getenv("LOG_LEVEL", "INFO"))
+logger.propagate = False
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+logger.addHandler(QueueHandler(_log_queue))
+_log_listener = QueueListener(_log_queue, logging.StreamHandler())
+
 # JWT configuratie
 SECRET_KEY = "your-secret-key-change-in-production"
 ALGORITHM = "HS256"
+SECRET_BYTES = SECRET_KEY.encode()
 ACCESS_TOKEN_EXPIRE_MINUTES = 1440  # 24 uur
+BCRYPT_ROUNDS = 12
+
+# Maximaal aantal openstaande WebSocket berichten per client
+SEND_QUEUE_SIZE = 16
+
+# Korte ticker cache: een burst requests op hetzelfde symbol kost één exchange call
+ticker_cache = TTLCache(maxsize=256, ttl=1)
+# Lopende exchange calls per symbol; een entry verdwijnt zodra de call klaar is
+ticker_fetches: Dict[str, asyncio.Task] = {}
+
+# Cache van geverifieerde tokens: sha256(token) -> (user_id, exp)
+# Mislukte verificaties worden nooit gecached.
+_jwt_cache = TTLCache(maxsize=10000, ttl=30)
+
+# Eén herbruikbare PyJWT instance in plaats van de module-level helpers
+_jwt = jwt.PyJWT()
 
 # Database models (vereenvoudigd - gebruik SQLAlchemy in productie)
 class User(BaseModel):
@@ -27,7 +68,7 @@ class User(BaseModel):
     email: str
     hashed_password: str
     is_active: bool = True
-    created_at: datetime = datetime.now()
+    created_at: datetime = Field(default_factory=datetime.now)
 
 class Trade(BaseModel):
     id: str
@@ -83,10 +124,45 @@ class GridStrategyCreate(BaseModel):
     grid_range_pct: float = Field(10.0, ge=1.0, le=50.0)
     order_size: float = Field(100.0, ge=10.0, le=10000.0)
 
+class TradeOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    
+    id: str
+    symbol: str
+    side: str
+    price: float
+    amount: float
+    exchange: str
+    timestamp: datetime
+    profit: Optional[float] = None
+
+class TradesResponse(BaseModel):
+    trades: List[TradeOut]
+    total: int
+    limit: int
+    offset: int
+
+class GridStrategyOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    
+    id: str
+    name: str
+    symbol: str
+    grid_type: str
+    num_grids: int
+    grid_range_pct: float
+    order_size: float
+    is_active: bool
+    created_at: datetime
+    last_updated: datetime
+
+class StrategiesResponse(BaseModel):
+    strategies: List[GridStrategyOut]
+
 class WebhookPayload(BaseModel):
     event: str
     data: Dict[str, Any]
-    timestamp: str = datetime.now().isoformat()
+    timestamp: str = Field(default_factory=lambda: datetime.now().isoformat())
 
 # Initialize app
 app = FastAPI(
@@ -94,16 +170,21 @@ app = FastAPI(
     description="Mobile API for Grid Trading Bot",
     version="2.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
 # CORS configuratie voor mobile apps
+# Expliciete origins (komma-gescheiden via CORS_ORIGINS); preflights worden een dag gecached
+CORS_ORIGINS = os.getenv("CORS_ORIGINS", "https://app.example.com").split(",")
+
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # Beperk dit in productie
+    allow_origins=CORS_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "PUT"],
+    allow_headers=["Authorization", "Content-Type"],
+    max_age=86400,
 )
 
 # Security
@@ -119,10 +200,153 @@ exchange_manager = ExchangeManager()
 notification_manager = NotificationManager()
 trading_systems = {}
 
+# Strategieën zijn CPU-bound: draai ze in een begrensde process pool, per worker
+# aangemaakt in startup. Met gunicorn -w N draaien er N x STRATEGY_WORKERS processen.
+STRATEGY_WORKERS = int(os.getenv("STRATEGY_WORKERS", "2"))
+strategy_executor: Optional[ProcessPoolExecutor] = None
+strategy_futures: Dict[str, asyncio.Task] = {}
+
 # Mock database (vervang met echte database)
-users_db = {}
+users_by_id: Dict[str, User] = {}
+users_by_username: Dict[str, User] = {}
 trades_db = {}
 strategies_db = {}
+performance_db = {}
+
+# Per-gebruiker indexen (in volgorde van toevoegen, nieuwste achteraan)
+trades_by_user: Dict[str, List[Trade]] = defaultdict(list)
+strategies_by_user: Dict[str, List[GridStrategy]] = defaultdict(list)
+
+# Gedeelde opslag: met REDIS_URL delen alle workers dezelfde users, trades,
+# strategieën en strategie performance, zodat de API met meerdere workers kan draaien, bijv.
+#   gunicorn ap:app -k uvicorn.workers.UvicornWorker -w $((2*CPU+1))
+# Zonder REDIS_URL worden de in-memory dicts hierboven gebruikt.
+REDIS_URL = os.getenv("REDIS_URL")
+redis_client: Optional[aioredis.Redis] = None
+
+async def store_get_user(user_id: str) -> Optional[User]:
+    """Haal gebruiker op via id"""
+    if redis_client is None:
+        return users_by_id.get(user_id)
+    
+    raw = await redis_client.get(f"user:{user_id}")
+    return User.model_validate_json(raw) if raw else None
+
+async def store_get_user_by_username(username: str) -> Optional[User]:
+    """Haal gebruiker op via username"""
+    if redis_client is None:
+        return users_by_username.get(username)
+    
+    user_id = await redis_client.get(f"username:{username}")
+    return await store_get_user(user_id) if user_id else None
+
+async def store_add_user(user: User) -> bool:
+    """Sla nieuwe gebruiker op; False als de username al bestaat"""
+    if redis_client is None:
+        if user.username in users_by_username:
+            return False
+        users_by_id[user.id] = user
+        users_by_username[user.username] = user
+        return True
+    
+    # Eén MULTI: de username claim (SET NX, ook tussen workers) en de user zelf gaan samen,
+    # zodat er nooit een username zonder user achterblijft
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.set(f"username:{user.username}", user.id, nx=True)
+        pipe.set(f"user:{user.id}", user.model_dump_json())
+        claimed, _ = await pipe.execute()
+    
+    if not claimed:
+        # Username was al bezet; de user onder het nieuwe id is onbereikbaar, ruim hem op
+        await redis_client.delete(f"user:{user.id}")
+        return False
+    return True
+
+async def store_add_trade(trade: Trade):
+    """Sla trade op"""
+    if redis_client is None:
+        trades_db[trade.id] = trade
+        trades_by_user[trade.user_id].append(trade)
+        return
+    
+    # Sorted set op timestamp: pagination via ZREVRANGE
+    await redis_client.zadd(
+        f"trades:{trade.user_id}",
+        {trade.model_dump_json(): trade.timestamp.timestamp()}
+    )
+
+async def store_get_trades(user_id: str, offset: int, limit: int) -> Tuple[List[Trade], int]:
+    """Haal pagina trades op (nieuwste eerst) plus het totaal"""
+    if redis_client is None:
+        user_trades = trades_by_user.get(user_id, [])
+        
+        # Lijst is al op tijd gesorteerd, nieuwste achteraan
+        end = max(len(user_trades) - offset, 0)
+        start = max(end - limit, 0)
+        return user_trades[start:end][::-1], len(user_trades)
+    
+    key = f"trades:{user_id}"
+    if limit <= 0:
+        return [], await redis_client.zcard(key)
+    
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.zrevrange(key, offset, offset + limit - 1)
+        pipe.zcard(key)
+        raw_trades, total = await pipe.execute()
+    
+    return [Trade.model_validate_json(raw) for raw in raw_trades], total
+
+async def store_save_strategy(strategy: GridStrategy):
+    """Sla (nieuwe of gewijzigde) strategie op"""
+    if redis_client is None:
+        if strategy.id not in strategies_db:
+            strategies_by_user[strategy.user_id].append(strategy)
+        strategies_db[strategy.id] = strategy
+        return
+    
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.set(f"strategy:{strategy.id}", strategy.model_dump_json())
+        pipe.zadd(f"strategies:{strategy.user_id}", {strategy.id: strategy.created_at.timestamp()})
+        await pipe.execute()
+
+async def store_get_strategy(strategy_id: str) -> Optional[GridStrategy]:
+    """Haal strategie op via id"""
+    if redis_client is None:
+        return strategies_db.get(strategy_id)
+    
+    raw = await redis_client.get(f"strategy:{strategy_id}")
+    return GridStrategy.model_validate_json(raw) if raw else None
+
+async def store_get_strategies(user_id: str) -> List[GridStrategy]:
+    """Haal alle strategieën van een gebruiker op"""
+    if redis_client is None:
+        return strategies_by_user.get(user_id, [])
+    
+    strategy_ids = await redis_client.zrange(f"strategies:{user_id}", 0, -1)
+    if not strategy_ids:
+        return []
+    
+    raw_strategies = await redis_client.mget([f"strategy:{sid}" for sid in strategy_ids])
+    return [GridStrategy.model_validate_json(raw) for raw in raw_strategies if raw]
+
+async def store_save_performance(strategy_id: str, performance: dict):
+    """Sla de performance van de laatste run op, zichtbaar voor alle workers"""
+    if redis_client is None:
+        performance_db[strategy_id] = performance
+        return
+    
+    await redis_client.set(
+        f"performance:{strategy_id}",
+        orjson.dumps(performance, option=orjson.OPT_SERIALIZE_NUMPY, default=float)
+    )
+
+async def store_get_performance(strategy_id: str) -> Optional[dict]:
+    """Haal de performance van de laatste run op"""
+    if redis_client is None:
+        return performance_db.get(strategy_id)
+    
+    raw = await redis_client.get(f"performance:{strategy_id}")
+    return orjson.loads(raw) if raw else None
 
 # Helper functies
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -134,30 +358,133 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    encoded_jwt = _jwt.encode(to_encode, SECRET_BYTES, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Verifieer JWT token"""
+    token = credentials.credentials
+    key = hashlib.sha256(token.encode()).digest()
+    now = time.time()
+    
+    cached = _jwt_cache.get(key)
+    if cached is not None:
+        user_id, exp_ts = cached
+        if exp_ts > now:
+            return user_id
+        # Verlopen token: uit cache halen en opnieuw verifiëren
+        _jwt_cache.pop(key, None)
+    
     try:
-        token = credentials.credentials
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("sub")
-        if user_id not in users_db:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        return user_id
+        payload = _jwt.decode(token, SECRET_BYTES, algorithms=[ALGORITHM])
     except jwt.PyJWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
+    
+    user_id = payload.get("sub")
+    if not user_id or await store_get_user(user_id) is None:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    
+    exp_ts = payload.get("exp")
+    if exp_ts is not None and exp_ts > now:
+        _jwt_cache[key] = (user_id, exp_ts)
+    
+    return user_id
+
+def _run_strategy_process(state: dict, params: dict):
+    """Draai strategie in een worker process; heen gaan params en run state, terug alleen
+    wat de run veranderd heeft"""
+    trading_system = GridTradingSystem.from_run_state(state)
+    results = trading_system.run_strategy(params)
+    return trading_system.export_run(results)
+
+async def _get_trading_system(strategy: GridStrategy) -> GridTradingSystem:
+    """Trading system van een strategie; op een worker die hem nog niet kent opnieuw
+    opgebouwd uit de opgeslagen strategie en de portfolio van de laatste run"""
+    trading_system = trading_systems.get(strategy.id)
+    if trading_system is None:
+        trading_system = GridTradingSystem(mode='simulation', symbol=strategy.symbol)
+        performance = await store_get_performance(strategy.id)
+        if performance:
+            trading_system.portfolio = dict(performance['portfolio'])
+        trading_systems[strategy.id] = trading_system
+    return trading_system
+
+async def _run_strategy(strategy_id: str, trading_system: GridTradingSystem, params: dict):
+    """Draai de strategie in de process pool, neem het resultaat over en sla de performance op"""
+    orders_from = len(trading_system.orders)
+    try:
+        run = await asyncio.get_running_loop().run_in_executor(
+            strategy_executor, _run_strategy_process, trading_system.run_state(), params
+        )
+    except asyncio.CancelledError:
+        raise
+    except Exception as exc:
+        logger.error("Strategy %s failed: %s", strategy_id, exc)
+        return
+    finally:
+        if strategy_futures.get(strategy_id) is asyncio.current_task():
+            del strategy_futures[strategy_id]
+    
+    trading_system.merge_run(run, orders_from)
+    await store_save_performance(strategy_id, {
+        "performance": trading_system.performance_metrics,
+        "portfolio": trading_system.portfolio,
+        "total_trades": len(trading_system.trades)
+    })
+
+def queue_notification(ntype: NotificationType, title: str, message: str,
+                       priority: int = 1, data: dict = None):
+    """Zet notificatie klaar voor de worker; blokkeert het request nooit"""
+    app.state.notif_queue.put_nowait(
+        partial(notification_manager.add_notification, ntype, title, message,
+                priority=priority, data=data)
+    )
+
+async def _notification_worker(notif_queue: asyncio.Queue):
+    """Verwerk notificaties één voor één buiten het request pad"""
+    while True:
+        job = await notif_queue.get()
+        try:
+            await run_in_threadpool(job)
+        except Exception as e:
+            logger.error("Error sending notification: %s", e)
+
+async def get_cached_ticker(symbol: str):
+    """Haal ticker op via de cache; gelijktijdige misses delen één call"""
+    ticker = ticker_cache.get(symbol)
+    if ticker is not None:
+        return ticker
+    
+    task = ticker_fetches.get(symbol)
+    if task is None:
+        task = asyncio.create_task(_fetch_ticker(symbol))
+        ticker_fetches[symbol] = task
+        task.add_done_callback(lambda _: ticker_fetches.pop(symbol, None))
+    
+    # shield: een afgebroken request annuleert de call niet voor de andere wachtenden
+    return await asyncio.shield(task)
+
+async def _fetch_ticker(symbol: str):
+    """Eén exchange call voor symbol; het resultaat gaat de cache in"""
+    ticker = await run_in_threadpool(exchange_manager.fetch_ticker, symbol)
+    if ticker:
+        ticker_cache[symbol] = ticker
+    return ticker
 
 # API Endpoints
 @app.post("/api/auth/register", response_model=Token)
 async def register(user: UserCreate):
     """Registreer nieuwe gebruiker"""
-    if user.username in users_db:
+    # Bezette username direct weigeren, zonder eerst een volle bcrypt ronde te betalen;
+    # store_add_user blijft de atomaire check bij gelijktijdige registraties
+    if await store_get_user_by_username(user.username) is not None:
         raise HTTPException(status_code=400, detail="Username already exists")
     
-    user_id = str(uuid.uuid4())
-    hashed_password = f"hashed_{user.password}"  # Gebruik bcrypt in productie
+    user_id = uuid.uuid4().hex
+    # bcrypt is bewust traag; buiten de event loop hashen
+    hashed_password = await run_in_threadpool(
+        lambda: bcrypt.hashpw(user.password.encode(), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode()
+    )
     
     new_user = User(
         id=user_id,
@@ -166,8 +493,8 @@ async def register(user: UserCreate):
         hashed_password=hashed_password
     )
     
-    users_db[user_id] = new_user
-    users_db[user.username] = new_user
+    if not await store_add_user(new_user):
+        raise HTTPException(status_code=400, detail="Username already exists")
     
     # Maak access token
     access_token = create_access_token(data={"sub": user_id})
@@ -181,14 +508,15 @@ async def register(user: UserCreate):
 @app.post("/api/auth/login", response_model=Token)
 async def login(user: UserLogin):
     """Login gebruiker"""
-    # Zoek gebruiker
-    found_user = None
-    for u in users_db.values():
-        if isinstance(u, User) and u.username == user.username:
-            found_user = u
-            break
-    
-    if not found_user or found_user.hashed_password != f"hashed_{user.password}":
+    found_user = await store_get_user_by_username(user.username)
+    
+    if not found_user:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    
+    password_ok = await run_in_threadpool(
+        bcrypt.checkpw, user.password.encode(), found_user.hashed_password.encode()
+    )
+    if not password_ok:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     # Maak token
@@ -203,7 +531,7 @@ async def login(user: UserLogin):
 @app.get("/api/user/profile")
 async def get_profile(user_id: str = Depends(verify_token)):
     """Haal gebruikersprofiel op"""
-    user = users_db.get(user_id)
+    user = await store_get_user(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -211,19 +539,15 @@ async def get_profile(user_id: str = Depends(verify_token)):
         "id": user.id,
         "username": user.username,
         "email": user.email,
-        "created_at": user.created_at.isoformat(),
+        "created_at": user.created_at,
         "is_active": user.is_active
     }
 
 @app.get("/api/exchanges")
 async def get_exchanges(user_id: str = Depends(verify_token)):
     """Haal ondersteunde exchanges op"""
-    exchanges = list(exchange_manager.SUPPORTED_EXCHANGES.keys())
-    
-    return {
-        "exchanges": exchanges,
-        "count": len(exchanges)
-    }
+    # Statisch voor de levensduur van het process; body is bij startup gebouwd
+    return Response(content=app.state.exchanges_payload, media_type="application/json")
 
 @app.post("/api/exchanges/{exchange_name}/connect")
 async def connect_exchange(
@@ -233,11 +557,11 @@ async def connect_exchange(
 ):
     """Verbinden met exchange"""
     try:
-        success = exchange_manager.add_exchange(exchange_name, credentials)
+        success = await run_in_threadpool(exchange_manager.add_exchange, exchange_name, credentials)
         
         if success:
             # Stuur notificatie
-            notification_manager.add_notification(
+            queue_notification(
                 NotificationType.INFO,
                 f"Exchange Connected",
                 f"Successfully connected to {exchange_name}",
@@ -256,25 +580,29 @@ async def connect_exchange(
 async def get_portfolio(user_id: str = Depends(verify_token)):
     """Haal portefeuille op"""
     try:
-        balances = exchange_manager.fetch_all_balances()
-        portfolio = exchange_manager.get_total_portfolio_value()
+        # Blokkerende ccxt calls buiten de event loop uitvoeren
+        balances = await run_in_threadpool(exchange_manager.fetch_all_balances)
+        portfolio = await run_in_threadpool(exchange_manager.get_total_portfolio_value)
         
         return {
             "balances": balances,
             "portfolio": portfolio,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": datetime.now()
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/market/{symbol}/price")
-async def get_market_price(symbol: str, user_id: str = Depends(verify_token)):
+async def get_market_price(symbol: str, response: Response, user_id: str = Depends(verify_token)):
     """Haal marktprijs op"""
-    ticker = exchange_manager.fetch_ticker(symbol)
+    ticker = await get_cached_ticker(symbol)
     
     if not ticker:
         raise HTTPException(status_code=404, detail="Symbol not found")
     
+    # Laat proxies/CDN's herhaalde requests binnen dezelfde seconde afvangen
+    response.headers["Cache-Control"] = "public, max-age=1"
+    
     return {
         "symbol": symbol,
         "bid": ticker.get('bid'),
@@ -283,7 +611,7 @@ async def get_market_price(symbol: str, user_id: str = Depends(verify_token)):
         "high": ticker.get('high'),
         "low": ticker.get('low'),
         "volume": ticker.get('volume'),
-        "timestamp": datetime.now().isoformat()
+        "timestamp": datetime.now()
     }
 
 @app.post("/api/trade")
@@ -295,7 +623,8 @@ async def execute_trade(
     """Voer een trade uit"""
     try:
         # Plaats order
-        order = exchange_manager.create_order(
+        order = await run_in_threadpool(
+            exchange_manager.create_order,
             symbol=trade.symbol,
             order_type='market' if not trade.price else 'limit',
             side=trade.side,
@@ -308,7 +637,8 @@ async def execute_trade(
             raise HTTPException(status_code=400, detail="Trade failed")
         
         # Sla trade op
-        trade_id = str(uuid.uuid4())
+        now = datetime.now()
+        trade_id = uuid.uuid4().hex
         trade_record = Trade(
             id=trade_id,
             user_id=user_id,
@@ -317,10 +647,10 @@ async def execute_trade(
             price=order.get('price', trade.price or 0),
             amount=trade.amount,
             exchange=trade.exchange,
-            timestamp=datetime.now()
+            timestamp=now
         )
         
-        trades_db[trade_id] = trade_record
+        await store_add_trade(trade_record)
         
         # Stuur notificatie
         background_tasks.add_task(
@@ -340,45 +670,24 @@ async def execute_trade(
             "success": True,
             "trade_id": trade_id,
             "order": order,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": now
         }
         
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@app.get("/api/trades")
+@app.get("/api/trades", response_model=TradesResponse)
 async def get_trades(
     limit: int = 50,
     offset: int = 0,
     user_id: str = Depends(verify_token)
 ):
     """Haal trade geschiedenis op"""
-    user_trades = [
-        trade for trade in trades_db.values() 
-        if trade.user_id == user_id
-    ]
-    
-    # Sorteer op timestamp
-    user_trades.sort(key=lambda x: x.timestamp, reverse=True)
-    
-    # Pagination
-    paginated_trades = user_trades[offset:offset + limit]
+    paginated_trades, total = await store_get_trades(user_id, offset, limit)
     
     return {
-        "trades": [
-            {
-                "id": trade.id,
-                "symbol": trade.symbol,
-                "side": trade.side,
-                "price": trade.price,
-                "amount": trade.amount,
-                "exchange": trade.exchange,
-                "timestamp": trade.timestamp.isoformat(),
-                "profit": trade.profit
-            }
-            for trade in paginated_trades
-        ],
-        "total": len(user_trades),
+        "trades": paginated_trades,
+        "total": total,
         "limit": limit,
         "offset": offset
     }
@@ -389,7 +698,8 @@ async def create_strategy(
     user_id: str = Depends(verify_token)
 ):
     """Maak nieuwe grid strategie"""
-    strategy_id = str(uuid.uuid4())
+    strategy_id = uuid.uuid4().hex
+    now = datetime.now()
     
     new_strategy = GridStrategy(
         id=strategy_id,
@@ -401,15 +711,14 @@ async def create_strategy(
         grid_range_pct=strategy.grid_range_pct,
         order_size=strategy.order_size,
         is_active=False,
-        created_at=datetime.now(),
-        last_updated=datetime.now()
+        created_at=now,
+        last_updated=now
     )
     
-    strategies_db[strategy_id] = new_strategy
+    await store_save_strategy(new_strategy)
     
     # Initialize trading system voor deze strategie
-    trading_system = GridTradingSystem(mode='simulation', symbol=strategy.symbol)
-    trading_systems[strategy_id] = trading_system
+    await _get_trading_system(new_strategy)
     
     return {
         "success": True,
@@ -423,35 +732,33 @@ async def activate_strategy(
     user_id: str = Depends(verify_token)
 ):
     """Activeer een strategie"""
-    strategy = strategies_db.get(strategy_id)
+    strategy = await store_get_strategy(strategy_id)
     
     if not strategy or strategy.user_id != user_id:
         raise HTTPException(status_code=404, detail="Strategy not found")
     
     strategy.is_active = True
     strategy.last_updated = datetime.now()
+    await store_save_strategy(strategy)
     
-    # Start trading strategie
-    trading_system = trading_systems.get(strategy_id)
-    if trading_system:
-        params = {
-            'grid_type': strategy.grid_type,
-            'num_grids': strategy.num_grids,
-            'grid_range_pct': strategy.grid_range_pct / 100,
-            'order_size': strategy.order_size
-        }
-        
-        # Start in background
-        import threading
-        thread = threading.Thread(
-            target=trading_system.run_strategy,
-            args=(params,),
-            daemon=True
+    # Start trading strategie; elke worker kan dit, het systeem wordt zo nodig opnieuw opgebouwd
+    trading_system = await _get_trading_system(strategy)
+    params = {
+        'grid_type': strategy.grid_type,
+        'num_grids': strategy.num_grids,
+        'grid_range_pct': strategy.grid_range_pct / 100,
+        'order_size': strategy.order_size
+    }
+    
+    # Start in background (niet opnieuw als hij op deze worker al draait)
+    running = strategy_futures.get(strategy_id)
+    if running is None or running.done():
+        strategy_futures[strategy_id] = asyncio.create_task(
+            _run_strategy(strategy_id, trading_system, params)
         )
-        thread.start()
     
     # Stuur notificatie
-    notification_manager.add_notification(
+    queue_notification(
         NotificationType.INFO,
         "Strategy Activated",
         f"Strategy '{strategy.name}' has been activated",
@@ -461,30 +768,36 @@ async def activate_strategy(
     
     return {"success": True, "message": "Strategy activated"}
 
-@app.get("/api/strategies")
+@app.put("/api/strategies/{strategy_id}/deactivate")
+async def deactivate_strategy(
+    strategy_id: str,
+    user_id: str = Depends(verify_token)
+):
+    """Deactiveer een strategie"""
+    strategy = await store_get_strategy(strategy_id)
+    
+    if not strategy or strategy.user_id != user_id:
+        raise HTTPException(status_code=404, detail="Strategy not found")
+    
+    strategy.is_active = False
+    strategy.last_updated = datetime.now()
+    await store_save_strategy(strategy)
+    
+    # Annuleert een nog wachtende run op deze worker; een lopend process maakt zijn run af.
+    # Een run op een andere worker loopt door, maar is_active staat in de gedeelde opslag.
+    future = strategy_futures.pop(strategy_id, None)
+    if future is not None:
+        future.cancel()
+    
+    return {"success": True, "message": "Strategy deactivated"}
+
+@app.get("/api/strategies", response_model=StrategiesResponse)
 async def get_strategies(user_id: str = Depends(verify_token)):
     """Haal alle strategieën op"""
-    user_strategies = [
-        strategy for strategy in strategies_db.values()
-        if strategy.user_id == user_id
-    ]
+    user_strategies = await store_get_strategies(user_id)
     
     return {
-        "strategies": [
-            {
-                "id": s.id,
-                "name": s.name,
-                "symbol": s.symbol,
-                "grid_type": s.grid_type,
-                "num_grids": s.num_grids,
-                "grid_range_pct": s.grid_range_pct,
-                "order_size": s.order_size,
-                "is_active": s.is_active,
-                "created_at": s.created_at.isoformat(),
-                "last_updated": s.last_updated.isoformat()
-            }
-            for s in user_strategies
-        ]
+        "strategies": user_strategies
     }
 
 @app.get("/api/strategies/{strategy_id}/performance")
@@ -493,21 +806,18 @@ async def get_strategy_performance(
     user_id: str = Depends(verify_token)
 ):
     """Haal strategie performance op"""
-    strategy = strategies_db.get(strategy_id)
+    strategy = await store_get_strategy(strategy_id)
     
     if not strategy or strategy.user_id != user_id:
         raise HTTPException(status_code=404, detail="Strategy not found")
     
-    trading_system = trading_systems.get(strategy_id)
+    # Uit de gedeelde opslag: de run kan op een andere worker gedraaid hebben
+    performance = await store_get_performance(strategy_id)
     
-    if not trading_system:
+    if not performance:
         return {"performance": {}, "message": "No performance data available"}
     
-    return {
-        "performance": trading_system.performance_metrics,
-        "portfolio": trading_system.portfolio,
-        "total_trades": len(trading_system.trades)
-    }
+    return performance
 
 @app.get("/api/notifications")
 async def get_notifications(
@@ -523,7 +833,7 @@ async def get_notifications(
                 "type": n.type.value,
                 "title": n.title,
                 "message": n.message,
-                "timestamp": n.timestamp.isoformat(),
+                "timestamp": n.timestamp,
                 "priority": n.priority,
                 "data": n.data
             }
@@ -539,7 +849,7 @@ async def webhook_receiver(
 ):
     """Ontvang webhooks van exchanges"""
     # Log webhook
-    print(f"Webhook received from {exchange}: {payload.event}")
+    logger.info("Webhook received from %s: %s", exchange, payload.event)
     
     # Verwerk webhook gebaseerd op event type
     if payload.event == "order_filled":
@@ -550,7 +860,7 @@ async def webhook_receiver(
         pass
     
     # Stuur notificatie
-    notification_manager.add_notification(
+    queue_notification(
         NotificationType.INFO,
         f"Webhook: {payload.event}",
         f"Webhook received from {exchange}",
@@ -568,7 +878,8 @@ async def get_arbitrage_opportunities(
 ):
     """Zoek arbitrage mogelijkheden"""
     try:
-        opportunities = exchange_manager.find_arbitrage_opportunities(
+        opportunities = await run_in_threadpool(
+            exchange_manager.find_arbitrage_opportunities,
             symbol=symbol,
             min_profit_pct=min_profit
         )
@@ -583,29 +894,121 @@ async def get_arbitrage_opportunities(
         raise HTTPException(status_code=500, detail=str(e))
 
 # WebSocket voor real-time updates
+class Subscriber:
+    """WebSocket met begrensde send queue; een trage client houdt publishers niet op"""
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SEND_QUEUE_SIZE)
+        self.task = asyncio.create_task(self._pump())
+    
+    async def _pump(self):
+        # Stopt bij de eerste mislukte send; send() geeft daarna False
+        try:
+            while True:
+                message = await self.queue.get()
+                await self.websocket.send_text(message)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            pass
+    
+    def send(self, message: str) -> bool:
+        """Zet message in de queue; False als de client niet bijhoudt"""
+        if self.task.done():
+            return False
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            return False
+        return True
+    
+    def close(self):
+        self.task.cancel()
+
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
+        self.active_connections: Dict[WebSocket, Subscriber] = {}
     
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        self.active_connections[websocket] = Subscriber(websocket)
     
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        subscriber = self.active_connections.pop(websocket, None)
+        if subscriber is not None:
+            subscriber.close()
+    
+    def send(self, message: str, websocket: WebSocket) -> bool:
+        """Zet message klaar voor websocket; trage of dode clients worden verwijderd"""
+        subscriber = self.active_connections.get(websocket)
+        if subscriber is None:
+            return False
+        
+        if not subscriber.send(message):
+            self.disconnect(websocket)
+            asyncio.create_task(self._close(websocket))
+            return False
+        return True
+    
+    async def _close(self, websocket: WebSocket):
+        try:
+            await websocket.close(code=1013)  # Try again later
+        except Exception:
+            pass
     
     async def send_personal_message(self, message: str, websocket: WebSocket):
-        await websocket.send_text(message)
+        self.send(message, websocket)
     
     async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(message)
-            except:
-                pass
+        for connection in list(self.active_connections):
+            self.send(message, connection)
 
 manager = ConnectionManager()
 
+# Eén publisher task per symbol; subscribers delen dezelfde ticker calls
+price_publishers: Dict[str, asyncio.Task] = {}
+price_subscribers: Dict[str, Set[WebSocket]] = defaultdict(set)
+
+def subscribe_price(websocket: WebSocket, symbol: str):
+    """Meld websocket aan voor price updates van symbol"""
+    price_subscribers[symbol].add(websocket)
+    
+    publisher = price_publishers.get(symbol)
+    if publisher is None or publisher.done():
+        price_publishers[symbol] = asyncio.create_task(send_price_updates(symbol))
+
+def unsubscribe_price(websocket: WebSocket):
+    """Meld websocket af voor alle price updates"""
+    for subscribers in price_subscribers.values():
+        subscribers.discard(websocket)
+
+# Portfolio is globaal; één publisher task bedient alle subscribers
+portfolio_publisher: Optional[asyncio.Task] = None
+portfolio_subscribers: Set[WebSocket] = set()
+
+def subscribe_portfolio(websocket: WebSocket):
+    """Meld websocket aan voor portfolio updates"""
+    global portfolio_publisher
+    
+    portfolio_subscribers.add(websocket)
+    
+    if portfolio_publisher is None or portfolio_publisher.done():
+        portfolio_publisher = asyncio.create_task(send_portfolio_updates())
+
+def unsubscribe_all(websocket: WebSocket):
+    """Meld websocket af voor alle updates"""
+    unsubscribe_price(websocket)
+    portfolio_subscribers.discard(websocket)
+
+def broadcast_update(subscribers: Set[WebSocket], update: dict):
+    """Serialiseer update één keer en zet hem in de queue van alle subscribers"""
+    message = orjson.dumps(update).decode()
+    
+    # Verwijder subscribers die niet meer bijhouden
+    for ws in list(subscribers):
+        if not manager.send(message, ws):
+            subscribers.discard(ws)
+
 @app.websocket("/ws/{client_id}")
 async def websocket_endpoint(websocket: WebSocket, client_id: str):
     """WebSocket voor real-time updates"""
@@ -618,33 +1021,36 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
             
             # Verwerk bericht
             try:
-                message = json.loads(data)
+                message = orjson.loads(data)
                 action = message.get("action")
                 
                 if action == "subscribe_price":
                     symbol = message.get("symbol", "BTC/USDT")
                     # Start price updates
-                    asyncio.create_task(send_price_updates(websocket, symbol))
+                    subscribe_price(websocket, symbol)
                 
                 elif action == "subscribe_portfolio":
                     # Start portfolio updates
-                    asyncio.create_task(send_portfolio_updates(websocket))
+                    subscribe_portfolio(websocket)
                 
                 elif action == "unsubscribe":
                     # Stop updates
-                    pass
+                    unsubscribe_all(websocket)
                     
-            except json.JSONDecodeError:
+            except orjson.JSONDecodeError:
                 pass
                 
     except WebSocketDisconnect:
         manager.disconnect(websocket)
+        unsubscribe_all(websocket)
 
-async def send_price_updates(websocket: WebSocket, symbol: str):
-    """Stuur real-time price updates"""
-    while True:
-        try:
-            ticker = exchange_manager.fetch_ticker(symbol)
+async def send_price_updates(symbol: str):
+    """Stuur real-time price updates naar alle subscribers van symbol"""
+    subscribers = price_subscribers[symbol]
+    
+    try:
+        while subscribers:
+            ticker = await get_cached_ticker(symbol)
             if ticker:
                 update = {
                     "type": "price_update",
@@ -652,32 +1058,39 @@ async def send_price_updates(websocket: WebSocket, symbol: str):
                     "price": ticker['last'],
                     "bid": ticker['bid'],
                     "ask": ticker['ask'],
-                    "timestamp": datetime.now().isoformat()
+                    "timestamp": datetime.now()
                 }
-                await websocket.send_text(json.dumps(update))
+                broadcast_update(subscribers, update)
             
             await asyncio.sleep(1)  # Update elke seconde
-            
-        except:
-            break
+    finally:
+        # Stop publisher zodra er geen subscribers meer zijn
+        price_publishers.pop(symbol, None)
+        if not subscribers:
+            price_subscribers.pop(symbol, None)
 
-async def send_portfolio_updates(websocket: WebSocket):
-    """Stuur portfolio updates"""
-    while True:
-        try:
-            portfolio = exchange_manager.get_total_portfolio_value()
-            update = {
-                "type": "portfolio_update",
-                "total_value": portfolio['total_value'],
-                "breakdown": portfolio['breakdown'],
-                "timestamp": datetime.now().isoformat()
-            }
-            await websocket.send_text(json.dumps(update))
+async def send_portfolio_updates():
+    """Stuur portfolio updates naar alle portfolio subscribers"""
+    global portfolio_publisher
+    
+    try:
+        while portfolio_subscribers:
+            try:
+                portfolio = await run_in_threadpool(exchange_manager.get_total_portfolio_value)
+            except Exception as e:
+                logger.error("Error fetching portfolio: %s", e)
+            else:
+                update = {
+                    "type": "portfolio_update",
+                    "total_value": portfolio['total_value'],
+                    "breakdown": portfolio['breakdown'],
+                    "timestamp": datetime.now()
+                }
+                broadcast_update(portfolio_subscribers, update)
             
             await asyncio.sleep(5)  # Update elke 5 seconden
-            
-        except:
-            break
+    finally:
+        portfolio_publisher = None
 
 # Health check endpoint
 @app.get("/health")
@@ -685,7 +1098,7 @@ async def health_check():
     """Health check endpoint"""
     return {
         "status": "healthy",
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": datetime.now(),
         "version": "2.0.0",
         "services": {
             "exchange_manager": len(exchange_manager.exchanges) > 0,
@@ -698,13 +1111,29 @@ async def health_check():
 @app.on_event("startup")
 async def startup_event():
     """Initialiseer bij startup"""
-    print("🚀 Grid Trading Bot API starting...")
+    global redis_client, strategy_executor
+    _log_listener.start()
+    logger.info("🚀 Grid Trading Bot API starting...")
+    
+    # Eén connection pool per worker
+    if REDIS_URL:
+        redis_client = aioredis.from_url(REDIS_URL, decode_responses=True)
+    
+    strategy_executor = ProcessPoolExecutor(max_workers=STRATEGY_WORKERS)
+    
+    exchanges = list(exchange_manager.SUPPORTED_EXCHANGES)
+    app.state.exchanges_payload = orjson.dumps({
+        "exchanges": exchanges,
+        "count": len(exchanges)
+    })
     
-    # Start notification scheduler
+    # Start notification scheduler en worker
     notification_manager.start_scheduler()
+    app.state.notif_queue = asyncio.Queue()
+    app.state.notif_worker = asyncio.create_task(_notification_worker(app.state.notif_queue))
     
     # Stuur startup notificatie
-    notification_manager.add_notification(
+    queue_notification(
         NotificationType.INFO,
         "API Started",
         "Grid Trading Bot API has been started successfully",
@@ -715,14 +1144,23 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup bij shutdown"""
-    notification_manager.stop_scheduler()
-    print("🛑 Grid Trading Bot API shutting down...")
+    notification_manager.stop()
+    app.state.notif_worker.cancel()
+    if strategy_executor is not None:
+        strategy_executor.shutdown(wait=False, cancel_futures=True)
+    await run_in_threadpool(exchange_manager.close_async)
+    if redis_client is not None:
+        await redis_client.aclose()
+    logger.info("🛑 Grid Trading Bot API shutting down...")
+    _log_listener.stop()
 
 if __name__ == "__main__":
+    # Voor meerdere workers: gunicorn ap:app -k uvicorn.workers.UvicornWorker -w $((2*CPU+1))
     uvicorn.run(
-        "api:app",
+        "ap:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,
-        log_level="info"
+        loop="uvloop",
+        http="httptools",
+        log_level="warning"
     )
\ No newline at end of file
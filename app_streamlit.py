@@ -5,10 +5,15 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import time
 from datetime import datetime, timedelta
-import ccxt
-import threading
-import json
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from itertools import islice
+import orjson
 import pickle
+import os
+import threading
+import tempfile
+import uuid
 from pathlib import Path
 import sys
 import warnings
@@ -59,19 +64,126 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource
+def get_backtester():
+    """Eén Backtester voor alle sessies; hij houdt geen state per run bij"""
+    return Backtester()
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def load_bars(symbol, start_date, end_date, interval):
+    """Haal historische data op; identieke requests komen uit de cache"""
+    return get_backtester().fetch_historical_data(
+        symbol=symbol,
+        start_date=start_date,
+        end_date=end_date,
+        interval=interval
+    )
+
+# Maximaal aantal trades/orders dat een sessie bewaart
+MAX_HISTORY = 1000
+# Verwacht aantal gelijktijdige sessies met een lopende strategie; de worker pool is zo groot
+MAX_SESSIONS = int(os.getenv('GRIDBOT_MAX_SESSIONS', '8'))
+
+def tail(items, n):
+    """Laatste n items van een lijst of deque, zonder de hele reeks te kopiëren"""
+    return list(islice(reversed(items), n))[::-1]
+
+# Opslag van equity curve en trades tussen page reloads, één bestand per sessie
+SESSION_DIR = Path('session_state')
+# Sessie bestanden die zo lang (seconden) niet geschreven zijn worden bij een save opgeruimd
+SESSION_TTL = 7 * 24 * 3600
+
+def session_file():
+    """Bestand van deze sessie; de sleutel staat in de URL zodat hij een reload overleeft"""
+    key = st.query_params.get('session', '')
+    if not (key.isalnum() and len(key) == 32):
+        key = uuid.uuid4().hex
+        st.query_params['session'] = key
+    return SESSION_DIR / f"{key}.pkl"
+
+def prune_sessions(keep):
+    """Verwijder sessie bestanden (en achtergebleven .tmp bestanden) ouder dan SESSION_TTL"""
+    cutoff = time.time() - SESSION_TTL
+    for path in SESSION_DIR.iterdir():
+        if path == keep:
+            continue
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+        except OSError:
+            # Tegelijk door een andere sessie opgeruimd of vervangen
+            pass
+
+def save_session():
+    """Schrijf equity curve en trades naar disk; NumPy arrays gaan out-of-band mee"""
+    state = {
+        'equity_ts': st.session_state.equity_ts,
+        'equity_val': st.session_state.equity_val,
+        'trades': list(st.session_state.trades),
+        'results_json': st.session_state.results_json
+    }
+    
+    buffers = []
+    payload = pickle.dumps(state, protocol=5, buffer_callback=buffers.append)
+    raw_buffers = [buffer.raw() for buffer in buffers]
+    
+    path = session_file()
+    tmp_name = None
+    try:
+        path.parent.mkdir(exist_ok=True)
+        # Eerst naar een tijdelijk bestand; os.replace maakt het atomisch zichtbaar
+        with tempfile.NamedTemporaryFile('wb', dir=path.parent, suffix='.tmp', delete=False) as f:
+            tmp_name = f.name
+            pickle.dump((payload, [buffer.nbytes for buffer in raw_buffers]), f, protocol=5)
+            for buffer in raw_buffers:
+                f.write(buffer)
+        os.replace(tmp_name, path)
+        prune_sessions(keep=path)
+    except OSError as e:
+        print(f"Error saving session: {e}")
+        if tmp_name is not None:
+            Path(tmp_name).unlink(missing_ok=True)
+
+def load_session():
+    """Herstel equity curve en trades van disk"""
+    try:
+        with session_file().open('rb') as f:
+            payload, sizes = pickle.load(f)
+            buffers = [bytearray(f.read(size)) for size in sizes]
+        state = pickle.loads(payload, buffers=buffers)
+    except FileNotFoundError:
+        return
+    except Exception as e:
+        print(f"Error loading session: {e}")
+        return
+    
+    st.session_state.equity_ts = state['equity_ts']
+    st.session_state.equity_val = state['equity_val']
+    st.session_state.trades = deque(state['trades'], maxlen=MAX_HISTORY)
+    st.session_state.results_json = state['results_json']
+
 # Initialiseer session state
 if 'trading_system' not in st.session_state:
+    # Trading system blijft per sessie: het houdt orders en portfolio bij
     st.session_state.trading_system = GridTradingSystem(mode='simulation')
-    st.session_state.backtester = Backtester()
+    st.session_state.backtester = get_backtester()
     st.session_state.is_running = False
     st.session_state.results = None
-    st.session_state.orders = []
-    st.session_state.trades = []
-    st.session_state.equity_curve = []
+    st.session_state.results_json = None
+    st.session_state.orders = deque(maxlen=MAX_HISTORY)
+    st.session_state.trades = deque(maxlen=MAX_HISTORY)
+    st.session_state.equity_ts = np.empty(0, dtype='datetime64[ns]')
+    st.session_state.equity_val = np.empty(0)
     st.session_state.update_counter = 0
+    st.session_state.strategy_future = None
+    st.session_state.strategy_stop = threading.Event()
+    st.session_state.last_tick = 0.0
+    st.session_state.rerun_pending = False
+    load_session()
 
 def main():
     """Hoofdpagina van de applicatie"""
+    collect_strategy_results()
     
     # Header
     st.markdown('<h1 class="main-header">🤖 Grid Trading Dashboard</h1>', 
@@ -129,10 +241,10 @@ def main():
                 stop_trading()
         
         # Download results
-        if st.session_state.results:
+        if st.session_state.results_json:
             st.download_button(
                 label="📥 Download Results",
-                data=json.dumps(st.session_state.results, indent=2, default=str),
+                data=st.session_state.results_json,
                 file_name=f"grid_trading_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
                 mime="application/json"
             )
@@ -146,13 +258,10 @@ def main():
             st.markdown(f"**Total Trades:** {len(st.session_state.trades)}")
         
         # Live update interval
-        update_interval = st.slider("Update Interval (s)", 1, 10, 3)
-        
-        # Auto-refresh
-        if st.session_state.is_running:
-            time.sleep(update_interval)
-            st.session_state.update_counter += 1
-            st.rerun()
+        update_interval = st.slider("Update Interval (s)", 1, 10, 3, key="update_interval")
+    
+    # Auto-refresh: alleen de live tabs draaien opnieuw, niet het hele script
+    run_every = update_interval if st.session_state.is_running else None
     
     # Main content area
     tab1, tab2, tab3, tab4 = st.tabs([
@@ -163,10 +272,10 @@ def main():
     ])
     
     with tab1:
-        display_dashboard()
+        st.fragment(display_dashboard, run_every=run_every)()
     
     with tab2:
-        display_performance()
+        st.fragment(display_performance, run_every=run_every)()
     
     with tab3:
         display_trades_orders()
@@ -174,6 +283,54 @@ def main():
     with tab4:
         display_backtesting()
 
+@st.cache_resource
+def get_strategy_executor():
+    """Gedeelde worker pool voor strategieën van alle sessies; overleeft reruns"""
+    return ThreadPoolExecutor(max_workers=MAX_SESSIONS, thread_name_prefix='strategy')
+
+def collect_strategy_results():
+    """Neem resultaten van een afgeronde strategie over; True als er nieuwe resultaten zijn"""
+    future = st.session_state.get('strategy_future')
+    if future is None or not future.done():
+        return False
+    
+    st.session_state.strategy_future = None
+    try:
+        results = future.result()
+    except Exception as e:
+        st.error(f"Strategy failed: {str(e)}")
+        return False
+    
+    st.session_state.results = results
+    # Eén keer encoderen; de download button hoeft dit niet bij elke rerun te doen
+    st.session_state.results_json = orjson.dumps(
+        results,
+        option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+        default=str
+    )
+    if 'equity_curve' in results:
+        set_equity_curve(results['equity_curve'])
+    if 'trades' in results:
+        st.session_state.trades = deque(results['trades'], maxlen=MAX_HISTORY)
+    
+    save_session()
+    return True
+
+def request_full_rerun(requested=True):
+    """Volledige rerun (sidebar status), hooguit één keer per update interval.
+    
+    Een afgeknepen verzoek blijft staan en wordt op een latere fragment tick uitgevoerd."""
+    if requested:
+        st.session_state.rerun_pending = True
+    if not st.session_state.get('rerun_pending'):
+        return
+    
+    now = time.monotonic()
+    if now - st.session_state.last_tick >= st.session_state.get('update_interval', 3):
+        st.session_state.last_tick = now
+        st.session_state.rerun_pending = False
+        st.rerun()
+
 def start_trading(mode, symbol, grid_type, num_grids, grid_range, order_size):
     """Start trading strategie"""
     st.session_state.is_running = True
@@ -199,40 +356,58 @@ def start_trading(mode, symbol, grid_type, num_grids, grid_range, order_size):
         'order_size': order_size
     }
     
-    # Start in thread om UI niet te blokkeren
-    def run_strategy():
-        results = trading_system.run_strategy(params)
-        st.session_state.results = results
-        if 'equity_curve' in results:
-            st.session_state.equity_curve = results['equity_curve']
-        if 'trades' in results:
-            st.session_state.trades = results['trades']
-    
-    thread = threading.Thread(target=run_strategy, daemon=True)
-    thread.start()
+    # Start in worker om UI niet te blokkeren; resultaten worden bij een rerun opgehaald.
+    # Eigen stop flag per run, zodat stop_trading alleen deze run stopt
+    st.session_state.strategy_stop = threading.Event()
+    st.session_state.strategy_future = get_strategy_executor().submit(
+        trading_system.run_strategy, params, st.session_state.strategy_stop
+    )
     
     st.success(f"Strategy started in {mode} mode!")
 
+def set_equity_curve(equity_curve):
+    """Sla equity curve op als twee NumPy kolommen; simulatie en backtest leveren die kolomsgewijs aan"""
+    st.session_state.equity_ts = np.asarray(equity_curve['timestamp'], dtype='datetime64[ns]')
+    st.session_state.equity_val = np.asarray(equity_curve['value'], dtype=float)
+
 def stop_trading():
     """Stop trading"""
     st.session_state.is_running = False
+    # Wachtende run annuleren; een lopende run ziet de stop flag en legt niets meer vast
+    st.session_state.strategy_stop.set()
+    if st.session_state.strategy_future is not None:
+        st.session_state.strategy_future.cancel()
+    st.session_state.strategy_future = None
     st.session_state.trading_system = GridTradingSystem(mode='simulation')
     st.success("Trading stopped and system reset!")
 
+@st.cache_data(max_entries=4)
+def build_grid_view(grid_levels):
+    """Bouw grid levels tabel; alleen opnieuw als de grid verandert"""
+    return pd.DataFrame({
+        'Level': range(1, len(grid_levels) + 1),
+        'Price': grid_levels
+    })
+
 def display_dashboard():
     """Display hoofd dashboard"""
+    st.session_state.update_counter += 1
+    request_full_rerun(collect_strategy_results())
     
     col1, col2 = st.columns([2, 1])
     
     with col1:
         st.subheader("📊 Market Overview")
         
+        # Vaste plek voor de chart: info en chart wisselen in hetzelfde element
+        price_slot = st.empty()
+        
         # Prijs chart met grid levels
-        if st.session_state.trading_system.grid_levels:
+        if len(st.session_state.trading_system.grid_levels):
             fig = create_price_grid_chart()
-            st.plotly_chart(fig, use_container_width=True, key="price_chart")
+            price_slot.plotly_chart(fig, use_container_width=True, key="price_chart")
         else:
-            st.info("Start trading to see market overview")
+            price_slot.info("Start trading to see market overview")
         
         # Portfolio overview
         st.subheader("💰 Portfolio Overview")
@@ -275,23 +450,59 @@ def display_dashboard():
         
         # Grid levels
         st.subheader("🎯 Grid Levels")
-        if st.session_state.trading_system.grid_levels:
-            grid_df = pd.DataFrame({
-                'Level': range(1, len(st.session_state.trading_system.grid_levels) + 1),
-                'Price': st.session_state.trading_system.grid_levels
-            })
-            st.dataframe(grid_df.style.format({'Price': '${:,.2f}'}), 
-                        height=300, use_container_width=True)
+        if len(st.session_state.trading_system.grid_levels):
+            grid_df = build_grid_view(tuple(st.session_state.trading_system.grid_levels))
+            st.dataframe(grid_df, height=300, use_container_width=True,
+                        column_config={'Price': st.column_config.NumberColumn(format="$%.2f")})
 
-def create_price_grid_chart():
-    """Maak prijs chart met grid levels"""
-    trading_system = st.session_state.trading_system
-    
-    # Genereer simulatie data
-    dates = pd.date_range(end=datetime.now(), periods=100, freq='1min')
-    current_price = getattr(trading_system, 'current_sim_price', 50000)
-    prices = current_price * (1 + np.random.normal(0, 0.001, 100).cumsum())
+# Maximaal aantal punten per lijn dat naar de browser gaat
+MAX_CHART_POINTS = 2000
+
+def downsample_lttb(x, y, n_out=MAX_CHART_POINTS):
+    """Largest-Triangle-Three-Buckets: indices van de punten die de vorm behouden"""
+    n = len(y)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+    
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=float)
+    if np.issubdtype(x.dtype, np.datetime64):
+        x = x.astype('int64')
+    x = x.astype(float)
+    
+    # Eerste en laatste punt blijven; de rest wordt in n_out - 2 buckets verdeeld
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    edges = np.append(edges, n)
+    
+    indices = np.empty(n_out, dtype=int)
+    indices[0] = 0
+    indices[-1] = n - 1
+    
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = edges[i + 1], edges[i + 2]
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        
+        # Kies het punt dat de grootste driehoek maakt met a en het volgende bucket gemiddelde
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a]) -
+            (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(area.argmax())
+        indices[i + 1] = a
     
+    return indices
+
+def get_cached_figure(key, build_figure):
+    """Haal figuur uit session state; bouw hem alleen de eerste keer op"""
+    if key not in st.session_state:
+        st.session_state[key] = build_figure()
+    return st.session_state[key]
+
+def build_price_grid_chart(grid_levels):
+    """Bouw lege prijs chart met grid levels"""
     fig = make_subplots(
         rows=2, cols=1,
         shared_xaxes=True,
@@ -303,7 +514,6 @@ def create_price_grid_chart():
     # Prijs lijn
     fig.add_trace(
         go.Scatter(
-            x=dates, y=prices,
             mode='lines',
             name='Price',
             line=dict(color='blue', width=2)
@@ -311,178 +521,292 @@ def create_price_grid_chart():
         row=1, col=1
     )
     
-    # Grid levels als horizontale lijnen
-    if trading_system.grid_levels:
-        for price in trading_system.grid_levels:
-            fig.add_hline(
-                y=price,
-                line_dash="dash",
-                line_color="gray",
-                opacity=0.3,
-                row=1, col=1
-            )
+    # Trade signals
+    fig.add_trace(
+        go.Scatter(
+            mode='markers',
+            name='Buy',
+            marker=dict(color='green', size=10, symbol='triangle-up')
+        ),
+        row=2, col=1
+    )
+    fig.add_trace(
+        go.Scatter(
+            mode='markers',
+            name='Sell',
+            marker=dict(color='red', size=10, symbol='triangle-down')
+        ),
+        row=2, col=1
+    )
+    
+    # Grid levels als horizontale lijnen in de bovenste subplot, in één keer gezet
+    grid_lines = [
+        dict(
+            type='line',
+            xref='x domain', x0=0, x1=1,
+            yref='y', y0=price, y1=price,
+            line=dict(dash='dash', color='gray'),
+            opacity=0.3
+        )
+        for price in grid_levels
+    ]
+    
+    fig.update_layout(height=600, showlegend=True, shapes=grid_lines)
+    return fig
+
+def next_sim_prices(current_price, periods=100):
+    """Schuif de simulatie prijzen één sample op in plaats van alles opnieuw te genereren"""
+    state = st.session_state
+    
+    if state.get('sim_base_price') != current_price:
+        # Nieuwe basisprijs: volledige reeks één keer genereren
+        state.sim_rng = np.random.default_rng()
+        state.sim_prices = current_price * (1 + state.sim_rng.normal(0, 0.001, periods).cumsum())
+        state.sim_base_price = current_price
+    else:
+        prices = state.sim_prices
+        prices[:-1] = prices[1:]
+        prices[-1] = prices[-2] * (1 + state.sim_rng.normal(0, 0.001))
+    
+    return state.sim_prices
+
+def create_price_grid_chart():
+    """Maak prijs chart met grid levels"""
+    trading_system = st.session_state.trading_system
+    
+    # Genereer simulatie data
+    dates = pd.date_range(end=datetime.now(), periods=100, freq='1min')
+    current_price = getattr(trading_system, 'current_sim_price', 50000)
+    prices = next_sim_prices(current_price)
+    
+    # Figuur alleen opnieuw opbouwen als de grid verandert
+    grid_levels = tuple(trading_system.grid_levels)
+    if st.session_state.get('price_fig_levels') != grid_levels:
+        st.session_state.pop('price_fig', None)
+        st.session_state.price_fig_levels = grid_levels
+    fig = get_cached_figure('price_fig', lambda: build_price_grid_chart(grid_levels))
     
     # Trade signals
-    if st.session_state.trades:
-        trades_df = pd.DataFrame(st.session_state.trades[-10:])  # Laatste 10 trades
-        buy_trades = trades_df[trades_df['side'] == 'buy']
-        sell_trades = trades_df[trades_df['side'] == 'sell']
-        
-        if not buy_trades.empty:
-            fig.add_trace(
-                go.Scatter(
-                    x=buy_trades['timestamp'],
-                    y=buy_trades['price'],
-                    mode='markers',
-                    name='Buy',
-                    marker=dict(color='green', size=10, symbol='triangle-up')
-                ),
-                row=2, col=1
-            )
-        
-        if not sell_trades.empty:
-            fig.add_trace(
-                go.Scatter(
-                    x=sell_trades['timestamp'],
-                    y=sell_trades['price'],
-                    mode='markers',
-                    name='Sell',
-                    marker=dict(color='red', size=10, symbol='triangle-down')
-                ),
-                row=2, col=1
-            )
+    recent_trades = tail(st.session_state.trades, 10)  # Laatste 10 trades
+    buy_x = [t['timestamp'] for t in recent_trades if t['side'] == 'buy']
+    buy_y = [t['price'] for t in recent_trades if t['side'] == 'buy']
+    sell_x = [t['timestamp'] for t in recent_trades if t['side'] == 'sell']
+    sell_y = [t['price'] for t in recent_trades if t['side'] == 'sell']
+    
+    with fig.batch_update():
+        fig.data[0].x = dates
+        fig.data[0].y = prices
+        fig.data[1].x = buy_x
+        fig.data[1].y = buy_y
+        fig.data[1].visible = bool(buy_x)
+        fig.data[2].x = sell_x
+        fig.data[2].y = sell_y
+        fig.data[2].visible = bool(sell_x)
+    
+    return fig
+
+def build_equity_chart():
+    """Bouw lege equity curve chart"""
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        mode='lines',
+        name='Portfolio Value',
+        line=dict(color='green', width=2),
+        fill='tozeroy',
+        fillcolor='rgba(0, 255, 0, 0.1)'
+    ))
+    
+    fig.update_layout(
+        xaxis_title="Time",
+        yaxis_title="Value (USDT)",
+        height=400
+    )
+    return fig
+
+def build_metrics_gauges():
+    """Bouw lege gauge charts voor performance metrics"""
+    fig = make_subplots(
+        rows=2, cols=2,
+        specs=[[{'type': 'indicator'}, {'type': 'indicator'}],
+               [{'type': 'indicator'}, {'type': 'indicator'}]],
+        subplot_titles=('Total Return', 'Win Rate', 
+                      'Sharpe Ratio', 'Max Drawdown')
+    )
     
-    fig.update_layout(height=600, showlegend=True)
+    # Total Return gauge
+    fig.add_trace(
+        go.Indicator(
+            mode="gauge+number",
+            title={'text': "Return %"},
+            gauge={'axis': {'range': [-20, 20]},
+                  'bar': {'color': "darkblue"},
+                  'steps': [
+                      {'range': [-20, 0], 'color': "red"},
+                      {'range': [0, 20], 'color': "green"}
+                  ]}
+        ),
+        row=1, col=1
+    )
+    
+    # Win Rate gauge
+    fig.add_trace(
+        go.Indicator(
+            mode="gauge+number",
+            title={'text': "Win Rate %"},
+            gauge={'axis': {'range': [0, 100]},
+                  'bar': {'color': "darkblue"}}
+        ),
+        row=1, col=2
+    )
+    
+    # Sharpe Ratio
+    fig.add_trace(
+        go.Indicator(
+            mode="number",
+            title={'text': "Sharpe Ratio"}
+        ),
+        row=2, col=1
+    )
+    
+    # Max Drawdown
+    fig.add_trace(
+        go.Indicator(
+            mode="gauge+number",
+            title={'text': "Max DD %"},
+            gauge={'axis': {'range': [0, 50]},
+                  'bar': {'color': "orange"}}
+        ),
+        row=2, col=2
+    )
+    
+    fig.update_layout(height=500)
+    return fig
+
+def build_drawdown_chart():
+    """Bouw lege drawdown chart"""
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        mode='lines',
+        name='Drawdown %',
+        line=dict(color='red', width=2),
+        fill='tozeroy',
+        fillcolor='rgba(255, 0, 0, 0.1)'
+    ))
+    
+    fig.update_layout(
+        xaxis_title="Time",
+        yaxis_title="Drawdown %",
+        height=300
+    )
     return fig
 
 def display_performance():
     """Display performance metrics en charts"""
+    request_full_rerun(collect_strategy_results())
     
     col1, col2 = st.columns(2)
     
     with col1:
         st.subheader("📈 Equity Curve")
+        equity_slot = st.empty()
         
-        if st.session_state.equity_curve:
-            eq_df = pd.DataFrame(st.session_state.equity_curve)
-            
-            fig = go.Figure()
-            fig.add_trace(go.Scatter(
-                x=eq_df['timestamp'],
-                y=eq_df['value'],
-                mode='lines',
-                name='Portfolio Value',
-                line=dict(color='green', width=2),
-                fill='tozeroy',
-                fillcolor='rgba(0, 255, 0, 0.1)'
-            ))
+        if st.session_state.equity_val.size:
+            equity_ts = st.session_state.equity_ts
+            equity_val = st.session_state.equity_val
+            idx = downsample_lttb(equity_ts, equity_val)
             
-            fig.update_layout(
-                xaxis_title="Time",
-                yaxis_title="Value (USDT)",
-                height=400
-            )
+            fig = get_cached_figure('equity_fig', build_equity_chart)
+            with fig.batch_update():
+                fig.data[0].x = equity_ts[idx]
+                fig.data[0].y = equity_val[idx]
             
-            st.plotly_chart(fig, use_container_width=True)
+            equity_slot.plotly_chart(fig, use_container_width=True, key="equity_chart")
         else:
-            st.info("Run strategy to see equity curve")
+            equity_slot.info("Run strategy to see equity curve")
     
     with col2:
         st.subheader("📊 Performance Metrics")
+        metrics_slot = st.empty()
         
         metrics = st.session_state.trading_system.performance_metrics
         
         if metrics:
             # Gauge charts
-            fig = make_subplots(
-                rows=2, cols=2,
-                specs=[[{'type': 'indicator'}, {'type': 'indicator'}],
-                       [{'type': 'indicator'}, {'type': 'indicator'}]],
-                subplot_titles=('Total Return', 'Win Rate', 
-                              'Sharpe Ratio', 'Max Drawdown')
-            )
-            
-            # Total Return gauge
-            fig.add_trace(
-                go.Indicator(
-                    mode="gauge+number",
-                    value=metrics.get('total_return', 0),
-                    title={'text': "Return %"},
-                    gauge={'axis': {'range': [-20, 20]},
-                          'bar': {'color': "darkblue"},
-                          'steps': [
-                              {'range': [-20, 0], 'color': "red"},
-                              {'range': [0, 20], 'color': "green"}
-                          ]}
-                ),
-                row=1, col=1
-            )
-            
-            # Win Rate gauge
-            fig.add_trace(
-                go.Indicator(
-                    mode="gauge+number",
-                    value=metrics.get('win_rate', 0),
-                    title={'text': "Win Rate %"},
-                    gauge={'axis': {'range': [0, 100]},
-                          'bar': {'color': "darkblue"}}
-                ),
-                row=1, col=2
-            )
+            fig = get_cached_figure('metrics_fig', build_metrics_gauges)
+            with fig.batch_update():
+                fig.data[0].value = metrics.get('total_return', 0)
+                fig.data[1].value = metrics.get('win_rate', 0)
+                fig.data[2].value = metrics.get('sharpe_ratio', 0)
+                fig.data[3].value = abs(metrics.get('max_drawdown', 0))
             
-            # Sharpe Ratio
-            fig.add_trace(
-                go.Indicator(
-                    mode="number",
-                    value=metrics.get('sharpe_ratio', 0),
-                    title={'text': "Sharpe Ratio"}
-                ),
-                row=2, col=1
-            )
-            
-            # Max Drawdown
-            fig.add_trace(
-                go.Indicator(
-                    mode="gauge+number",
-                    value=abs(metrics.get('max_drawdown', 0)),
-                    title={'text': "Max DD %"},
-                    gauge={'axis': {'range': [0, 50]},
-                          'bar': {'color': "orange"}}
-                ),
-                row=2, col=2
-            )
-            
-            fig.update_layout(height=500)
-            st.plotly_chart(fig, use_container_width=True)
+            metrics_slot.plotly_chart(fig, use_container_width=True, key="metrics_chart")
     
     # Drawdown chart
     st.subheader("📉 Drawdown Analysis")
+    drawdown_slot = st.empty()
     
-    if st.session_state.equity_curve:
-        eq_df = pd.DataFrame(st.session_state.equity_curve)
+    if st.session_state.equity_val.size:
+        equity_val = st.session_state.equity_val
         
         # Calculate drawdown
-        eq_df['peak'] = eq_df['value'].expanding().max()
-        eq_df['drawdown'] = (eq_df['value'] - eq_df['peak']) / eq_df['peak'] * 100
+        peak = np.maximum.accumulate(equity_val)
+        drawdown = (equity_val - peak) / peak * 100
         
-        fig = go.Figure()
-        fig.add_trace(go.Scatter(
-            x=eq_df['timestamp'],
-            y=eq_df['drawdown'],
-            mode='lines',
-            name='Drawdown %',
-            line=dict(color='red', width=2),
-            fill='tozeroy',
-            fillcolor='rgba(255, 0, 0, 0.1)'
-        ))
-        
-        fig.update_layout(
-            xaxis_title="Time",
-            yaxis_title="Drawdown %",
-            height=300
-        )
+        idx = downsample_lttb(st.session_state.equity_ts, drawdown)
         
-        st.plotly_chart(fig, use_container_width=True)
+        fig = get_cached_figure('drawdown_fig', build_drawdown_chart)
+        with fig.batch_update():
+            fig.data[0].x = st.session_state.equity_ts[idx]
+            fig.data[0].y = drawdown[idx]
+        
+        drawdown_slot.plotly_chart(fig, use_container_width=True, key="drawdown_chart")
+
+# Kolom formattering voor orders en trades; de dataframe renderer doet het werk
+ORDER_COLUMNS = {
+    'timestamp': st.column_config.DatetimeColumn(format="HH:mm:ss"),
+    'signal': st.column_config.TextColumn(""),
+    'side': st.column_config.TextColumn(),
+    'price': st.column_config.NumberColumn(format="$%.2f"),
+    'amount': st.column_config.NumberColumn(format="%.6f")
+}
+TRADE_COLUMNS = {
+    **ORDER_COLUMNS,
+    'value': st.column_config.NumberColumn(format="$%.2f"),
+    'fee': st.column_config.NumberColumn(format="$%.4f")
+}
+
+def add_side_signal(df):
+    """Voeg kleur indicator voor de side column toe"""
+    if 'side' in df.columns:
+        df.insert(0, 'signal', np.where(df['side'] == 'buy', '🟢', '🔴'))
+
+@st.cache_data(max_entries=8)
+def build_orders_view(orders):
+    """Bouw orders tabel; alleen opnieuw als de laatste orders veranderen"""
+    orders_df = pd.DataFrame(list(orders))
+    
+    # Timestamp blijft datetime64; formattering gebeurt in de browser
+    if 'timestamp' in orders_df.columns:
+        orders_df['timestamp'] = pd.to_datetime(orders_df['timestamp'])
+    
+    add_side_signal(orders_df)
+    return orders_df
+
+@st.cache_data(max_entries=8)
+def build_trades_view(trades):
+    """Bouw trades tabel; alleen opnieuw als de laatste trades veranderen"""
+    trades_df = pd.DataFrame(list(trades))
+    
+    # Bereken profit/loss
+    if 'price' in trades_df.columns and 'amount' in trades_df.columns:
+        trades_df['value'] = trades_df['price'] * trades_df['amount']
+    
+    # Timestamp blijft datetime64; formattering gebeurt in de browser
+    if 'timestamp' in trades_df.columns:
+        trades_df['timestamp'] = pd.to_datetime(trades_df['timestamp'])
+    
+    add_side_signal(trades_df)
+    return trades_df
 
 def display_trades_orders():
     """Display trades en orders"""
@@ -493,24 +817,13 @@ def display_trades_orders():
         st.subheader("📋 Recent Orders")
         
         if st.session_state.trading_system.orders:
-            orders_df = pd.DataFrame(st.session_state.trading_system.orders[-20:])  # Laatste 20 orders
-            
-            # Format timestamp
-            if 'timestamp' in orders_df.columns:
-                orders_df['timestamp'] = pd.to_datetime(orders_df['timestamp']).dt.strftime('%H:%M:%S')
-            
-            # Styling voor side column
-            def color_side(val):
-                color = 'green' if val == 'buy' else 'red'
-                return f'color: {color}; font-weight: bold'
+            orders_df = build_orders_view(tuple(tail(st.session_state.trading_system.orders, 20)))  # Laatste 20 orders
             
             st.dataframe(
-                orders_df.style.applymap(color_side, subset=['side']).format({
-                    'price': '${:,.2f}',
-                    'amount': '{:.6f}'
-                }),
+                orders_df,
                 height=400,
-                use_container_width=True
+                use_container_width=True,
+                column_config=ORDER_COLUMNS
             )
         else:
             st.info("No orders yet")
@@ -519,25 +832,13 @@ def display_trades_orders():
         st.subheader("💰 Recent Trades")
         
         if st.session_state.trades:
-            trades_df = pd.DataFrame(st.session_state.trades[-20:])  # Laatste 20 trades
-            
-            # Bereken profit/loss
-            if 'price' in trades_df.columns and 'amount' in trades_df.columns:
-                trades_df['value'] = trades_df['price'] * trades_df['amount']
-            
-            # Format timestamp
-            if 'timestamp' in trades_df.columns:
-                trades_df['timestamp'] = pd.to_datetime(trades_df['timestamp']).dt.strftime('%H:%M:%S')
+            trades_df = build_trades_view(tuple(tail(st.session_state.trades, 20)))  # Laatste 20 trades
             
             st.dataframe(
-                trades_df.style.applymap(color_side, subset=['side']).format({
-                    'price': '${:,.2f}',
-                    'amount': '{:.6f}',
-                    'value': '${:,.2f}',
-                    'fee': '${:,.4f}'
-                }),
+                trades_df,
                 height=400,
-                use_container_width=True
+                use_container_width=True,
+                column_config=TRADE_COLUMNS
             )
             
             # Trade statistics
@@ -558,6 +859,9 @@ def display_trades_orders():
         else:
             st.info("No trades yet")
 
+# Aantal stappen per parameter in de backtest sweep
+SWEEP_STEPS = 3
+
 def display_backtesting():
     """Display backtesting interface"""
     
@@ -630,18 +934,27 @@ def display_backtesting():
                 backtester = st.session_state.backtester
                 
                 # Haal historische data op
-                data = backtester.fetch_historical_data(
-                    symbol=symbol_backtest,
-                    start_date=start_date.strftime('%Y-%m-%d'),
-                    end_date=end_date.strftime('%Y-%m-%d'),
-                    interval=interval
+                data = load_bars(
+                    symbol_backtest,
+                    start_date.strftime('%Y-%m-%d'),
+                    end_date.strftime('%Y-%m-%d'),
+                    interval
                 )
                 
-                # Voer backtest uit
+                # Parameter sweep over het volledige grid in één batch
+                param_sets = np.array(np.meshgrid(
+                    np.linspace(grid_range_min, grid_range_max, SWEEP_STEPS) / 100,
+                    np.unique(np.linspace(num_grids_min, num_grids_max, SWEEP_STEPS).round()),
+                    np.linspace(order_size_min, order_size_max, SWEEP_STEPS)
+                )).reshape(3, -1).T
+                sweep = backtester.batch_backtest(data, param_sets, fee_rate)
+                
+                # Voer backtest uit met de beste parameters (Sharpe ratio)
+                best = int(np.argmax(sweep['sharpe_ratio']))
                 strategy_params = {
-                    'grid_range_pct': (grid_range_min + grid_range_max) / 200,
-                    'num_grids': (num_grids_min + num_grids_max) // 2,
-                    'order_size': (order_size_min + order_size_max) / 2,
+                    'grid_range_pct': param_sets[best, 0],
+                    'num_grids': int(param_sets[best, 1]),
+                    'order_size': param_sets[best, 2],
                     'fee_rate': fee_rate
                 }
                 
@@ -664,10 +977,11 @@ def display_backtesting():
                 
                 # Equity curve
                 fig = go.Figure()
-                equity_df = pd.DataFrame(results['equity_curve'])
+                equity_curve = results['equity_curve']
+                idx = downsample_lttb(equity_curve['timestamp'], equity_curve['value'])
                 fig.add_trace(go.Scatter(
-                    x=equity_df['timestamp'],
-                    y=equity_df['value'],
+                    x=equity_curve['timestamp'][idx],
+                    y=equity_curve['value'][idx],
                     mode='lines',
                     name='Portfolio Value',
                     line=dict(color='blue', width=2)
@@ -682,6 +996,16 @@ def display_backtesting():
                 
                 st.plotly_chart(fig, use_container_width=True)
                 
+                # Parameter sweep
+                st.subheader("🎯 Parameter Sweep")
+                sweep_df = pd.DataFrame({
+                    'grid_range_pct': param_sets[:, 0] * 100,
+                    'num_grids': param_sets[:, 1].astype(int),
+                    'order_size': param_sets[:, 2],
+                    **sweep
+                }).sort_values('sharpe_ratio', ascending=False)
+                st.dataframe(sweep_df, height=300, use_container_width=True, hide_index=True)
+                
             except Exception as e:
                 st.error(f"Backtest failed: {str(e)}")
 
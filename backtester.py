@@ -1,10 +1,299 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import yfinance as yf
+from functools import lru_cache
 import warnings
+import hashlib
+import time
+from pathlib import Path
+from joblib import Parallel, delayed
+from _njit import njit, prange, NUMBA_AVAILABLE
 warnings.filterwarnings('ignore')
 
+# OHLCV kolommen als float32: halve geheugenbandbreedte in de backtest loop.
+# Cash en posities blijven float64 om afronding over veel trades te voorkomen.
+OHLCV_DTYPE = np.float32
+
+# Maximale periode per request voor intraday data bij Yahoo Finance
+FETCH_CHUNK_DAYS = {'1m': 7, '5m': 30, '15m': 30}
+
+# Eén record per trade; 'index' is de bar index in de close array, side 0 = buy, 1 = sell
+TRADE_DTYPE = np.dtype([
+    ('index', np.int64),
+    ('side', np.int8),
+    ('price', np.float64),
+    ('amount', np.float64),
+    ('fee', np.float64),
+    ('profit', np.float64)
+])
+
+# Opgehaalde koersdata wordt als parquet bewaard, zodat herhaalde runs geen netwerk nodig hebben
+DATA_CACHE_DIR = Path('data_cache')
+
+# Cache voor een periode die tot vandaag loopt is maar zo lang geldig (seconden);
+# daarna wordt alleen het stuk na de laatste gecachte candle opgehaald
+DATA_CACHE_MAX_AGE = 3600
+
+def _data_cache_path(symbol, start_date, end_date, interval):
+    """Cache bestand voor een (symbol, start, end, interval) combinatie"""
+    key = f"{symbol}|{start_date}|{end_date}|{interval}"
+    return DATA_CACHE_DIR / f"{hashlib.sha1(key.encode()).hexdigest()}.parquet"
+
+def _read_data_cache(path):
+    """Lees gecachte data; None als er (nog) niets bruikbaars staat"""
+    if not path.exists():
+        return None
+    try:
+        return pd.read_parquet(path)
+    except Exception as e:
+        print(f"Error reading data cache {path}: {e}")
+        return None
+
+def _data_cache_fresh(path, end_date):
+    """Afgesloten periodes veranderen niet meer; lopende periodes verlopen na DATA_CACHE_MAX_AGE"""
+    if pd.Timestamp(end_date) < pd.Timestamp.now().normalize():
+        return True
+    return time.time() - path.stat().st_mtime < DATA_CACHE_MAX_AGE
+
+def _normalize_ohlcv(raw, symbol):
+    """OHLCV kolommen van één symbool uit een yf.download resultaat"""
+    df = raw[symbol] if isinstance(raw.columns, pd.MultiIndex) else raw
+    
+    # Alleen OHLCV bewaren; rijen die alleen bij een ander symbool bestaan vallen weg
+    return df[['Open', 'High', 'Low', 'Close', 'Volume']].dropna(how='all').rename(columns={
+        'Open': 'open',
+        'High': 'high',
+        'Low': 'low',
+        'Close': 'close',
+        'Volume': 'volume'
+    }).astype(OHLCV_DTYPE)
+
+def _write_data_cache(path, df):
+    """Schrijf data naar de cache; een mislukte write is geen reden om te falen"""
+    try:
+        DATA_CACHE_DIR.mkdir(exist_ok=True)
+        df.to_parquet(path)
+    except Exception as e:
+        print(f"Error writing data cache {path}: {e}")
+
+@njit(cache=True)
+def _grid_backtest_loop(close, hit_levels, initial_cash, order_size, fee_rate, trades):
+    """Bar-voor-bar grid simulatie op NumPy arrays; side 0 = buy, 1 = sell
+    
+    trades is een voorgealloceerde TRADE_DTYPE buffer van len(close) * len(hit_levels)
+    records; de eerste n_trades worden gevuld.
+    """
+    n = close.shape[0]
+    equity = np.empty(n, dtype=np.float64)
+    
+    cash = initial_cash
+    positions = 0.0
+    buy_price_sum = 0.0
+    buy_count = 0
+    n_trades = 0
+    
+    for i in range(n):
+        current_price = close[i]
+        
+        for k in range(hit_levels.shape[0]):
+            grid_price = current_price * hit_levels[k]
+            
+            if current_price <= grid_price:
+                # Buy order
+                amount = order_size / grid_price
+                cost = amount * grid_price * (1.0 + fee_rate)
+                
+                if cash >= cost:
+                    cash -= cost
+                    positions += amount
+                    buy_price_sum += grid_price
+                    buy_count += 1
+                    
+                    trades[n_trades]['index'] = i
+                    trades[n_trades]['side'] = 0
+                    trades[n_trades]['price'] = grid_price
+                    trades[n_trades]['amount'] = amount
+                    trades[n_trades]['fee'] = amount * grid_price * fee_rate
+                    trades[n_trades]['profit'] = 0.0
+                    n_trades += 1
+            
+            elif positions > 0:
+                # Sell order
+                sell_amount = min(positions, order_size / grid_price)
+                cash += sell_amount * grid_price * (1.0 - fee_rate)
+                positions -= sell_amount
+                
+                # Bereken profit (vereenvoudigd)
+                avg_buy_price = buy_price_sum / buy_count if buy_count > 0 else grid_price
+                
+                trades[n_trades]['index'] = i
+                trades[n_trades]['side'] = 1
+                trades[n_trades]['price'] = grid_price
+                trades[n_trades]['amount'] = sell_amount
+                trades[n_trades]['fee'] = sell_amount * grid_price * fee_rate
+                trades[n_trades]['profit'] = (grid_price - avg_buy_price) * sell_amount
+                n_trades += 1
+        
+        # Update portfolio waarde
+        equity[i] = cash + positions * current_price
+    
+    return n_trades, equity, cash, positions
+
+@lru_cache(maxsize=32)
+def _generate_test_arrays(start_date, end_date, base_price, seed=42):
+    """Test data arrays per (periode, prijs, seed); herhaalde sweeps hergebruiken ze"""
+    dates = pd.date_range(start=start_date, end=end_date, freq='1H')
+    n_periods = len(dates)
+    
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0.0001, 0.02, n_periods)
+    prices = base_price * np.exp(np.cumsum(returns))
+    volume = rng.lognormal(8, 1, n_periods)
+    
+    # Gedeeld via de cache, dus read-only
+    dates_ns = dates.asi8
+    for array in (dates_ns, prices, volume):
+        array.flags.writeable = False
+    return dates_ns, prices, volume
+
+@njit(cache=True)
+def _max_drawdown(values):
+    """Grootste relatieve daling vanaf de lopende piek, in één pass"""
+    peak = values[0]
+    max_dd = 0.0
+    for i in range(values.shape[0]):
+        value = values[i]
+        if value > peak:
+            peak = value
+        else:
+            drawdown = (value - peak) / peak
+            if drawdown < max_dd:
+                max_dd = drawdown
+    return max_dd
+
+@njit(parallel=True, cache=True)
+def _batch_grid_backtest(close, param_sets, initial_cash):
+    """Volledige parameter sweep in één kernel, parallel over de parameter sets.
+    
+    param_sets kolommen: grid_range_pct, num_grids, order_size, fee_rate.
+    Resultaat kolommen: total_return_pct, sharpe_ratio, max_drawdown_pct,
+    win_rate_pct, total_trades.
+    """
+    n = close.shape[0]
+    n_sets = param_sets.shape[0]
+    out = np.zeros((n_sets, 5))
+    
+    for p in prange(n_sets):
+        grid_range_pct = param_sets[p, 0]
+        num_grids = int(param_sets[p, 1])
+        order_size = param_sets[p, 2]
+        fee_rate = param_sets[p, 3]
+        
+        # Levels die geraakt worden, zoals np.linspace(1 - r, 1 + r, num_grids)
+        hit_levels = np.empty(num_grids)
+        n_hits = 0
+        step = 2.0 * grid_range_pct / (num_grids - 1) if num_grids > 1 else 0.0
+        for k in range(num_grids):
+            level = 1.0 - grid_range_pct + k * step
+            if abs(level - 1.0) < 0.001 * level:
+                hit_levels[n_hits] = level
+                n_hits += 1
+        
+        cash = initial_cash
+        positions = 0.0
+        buy_price_sum = 0.0
+        buy_count = 0
+        n_trades = 0
+        wins = 0
+        
+        first_equity = 0.0
+        prev_equity = 0.0
+        peak = 0.0
+        max_dd = 0.0
+        # Lopend gemiddelde en variantie van de returns (Welford)
+        ret_count = 0
+        ret_mean = 0.0
+        ret_m2 = 0.0
+        
+        for i in range(n):
+            current_price = close[i]
+            
+            for k in range(n_hits):
+                grid_price = current_price * hit_levels[k]
+                
+                if current_price <= grid_price:
+                    # Buy order
+                    amount = order_size / grid_price
+                    cost = amount * grid_price * (1.0 + fee_rate)
+                    if cash >= cost:
+                        cash -= cost
+                        positions += amount
+                        buy_price_sum += grid_price
+                        buy_count += 1
+                        n_trades += 1
+                
+                elif positions > 0:
+                    # Sell order
+                    sell_amount = min(positions, order_size / grid_price)
+                    cash += sell_amount * grid_price * (1.0 - fee_rate)
+                    positions -= sell_amount
+                    
+                    avg_buy_price = buy_price_sum / buy_count if buy_count > 0 else grid_price
+                    if (grid_price - avg_buy_price) * sell_amount > 0:
+                        wins += 1
+                    n_trades += 1
+            
+            equity = cash + positions * current_price
+            
+            if i == 0:
+                first_equity = equity
+                peak = equity
+            else:
+                if prev_equity != 0:
+                    ret = equity / prev_equity - 1.0
+                    ret_count += 1
+                    delta = ret - ret_mean
+                    ret_mean += delta / ret_count
+                    ret_m2 += delta * (ret - ret_mean)
+                
+                if equity > peak:
+                    peak = equity
+                else:
+                    drawdown = (equity - peak) / peak
+                    if drawdown < max_dd:
+                        max_dd = drawdown
+            
+            prev_equity = equity
+        
+        if n >= 2:
+            out[p, 0] = (prev_equity / first_equity - 1.0) * 100
+            if ret_count > 1:
+                std = np.sqrt(ret_m2 / (ret_count - 1))
+                if std != 0:
+                    out[p, 1] = ret_mean / std * np.sqrt(365 * 24)
+            out[p, 2] = max_dd * 100
+            out[p, 3] = wins / n_trades * 100 if n_trades > 0 else 0.0
+            out[p, 4] = n_trades
+    
+    return out
+
+_kernels_warm = False
+
+def _warmup_kernels():
+    """Compileer de Numba kernels vooraf (of laad ze uit de cache) met dummy data"""
+    global _kernels_warm
+    if _kernels_warm or not NUMBA_AVAILABLE:
+        return
+    
+    # Zelfde dtypes als een echte run, zodat dezelfde specialisatie wordt gebruikt
+    close = np.full(8, 100.0, dtype=OHLCV_DTYPE)
+    hit_levels = np.ones(1, dtype=np.float64)
+    trades = np.empty(len(close), dtype=TRADE_DTYPE)
+    _grid_backtest_loop(close, hit_levels, 1000.0, 10.0, 0.001, trades)
+    _max_drawdown(close.astype(np.float64))
+    _batch_grid_backtest(close, np.array([[0.1, 21.0, 10.0, 0.001]]), 1000.0)
+    _kernels_warm = True
+
 class Backtester:
     """Backtesting framework voor Grid Trading strategieën"""
     
@@ -12,168 +301,206 @@ class Backtester:
         self.initial_capital = initial_capital
         self.results = {}
         self.comparisons = {}
+        _warmup_kernels()
     
     def fetch_historical_data(self, symbol, start_date, end_date, interval='1h'):
-        """Haal historische data op van Yahoo Finance"""
-        try:
-            ticker = yf.Ticker(symbol)
-            df = ticker.history(start=start_date, end=end_date, interval=interval)
-            
-            df = df.rename(columns={
-                'Open': 'open',
-                'High': 'high',
-                'Low': 'low',
-                'Close': 'close',
-                'Volume': 'volume'
-            })
-            
-            return df
-        except Exception as e:
-            print(f"Error fetching data: {e}")
-            return self.generate_test_data(start_date, end_date)
+        """Haal historische data op van Yahoo Finance
+        
+        symbol mag een string of een lijst zijn; bij een lijst komt er een dict
+        symbol -> DataFrame terug. Resultaten worden op schijf gecached.
+        """
+        symbols = [symbol] if isinstance(symbol, str) else list(symbol)
+        frames = {}
+        missing = []
+        stale = {}
+        
+        for sym in symbols:
+            path = _data_cache_path(sym, start_date, end_date, interval)
+            cached = _read_data_cache(path)
+            if cached is None or cached.empty:
+                missing.append(sym)
+            elif _data_cache_fresh(path, end_date):
+                frames[sym] = cached
+            else:
+                stale[sym] = cached
+        
+        if stale:
+            # Alleen de candles sinds de oudste laatste gecachte candle bijhalen
+            try:
+                since = min(df.index[-1] for df in stale.values())
+                raw = self._download_history(list(stale), since, end_date, interval)
+                
+                for sym, cached in stale.items():
+                    df = pd.concat([cached, _normalize_ohlcv(raw, sym)])
+                    df = df[~df.index.duplicated(keep='last')]
+                    _write_data_cache(_data_cache_path(sym, start_date, end_date, interval), df)
+                    frames[sym] = df
+            except Exception as e:
+                print(f"Error updating cached data: {e}")
+                frames.update(stale)
+        
+        if missing:
+            try:
+                raw = self._download_history(missing, start_date, end_date, interval)
+                
+                for sym in missing:
+                    df = _normalize_ohlcv(raw, sym)
+                    
+                    if not df.empty:
+                        _write_data_cache(_data_cache_path(sym, start_date, end_date, interval), df)
+                    frames[sym] = df
+            except Exception as e:
+                print(f"Error fetching data: {e}")
+                for sym in missing:
+                    if sym not in frames:
+                        frames[sym] = self.generate_test_data(start_date, end_date)
+        
+        return frames[symbol] if isinstance(symbol, str) else frames
+    
+    def _download_history(self, symbols, start_date, end_date, interval):
+        """Download ruwe koersdata voor alle symbolen tegelijk (threaded)"""
+        # Pas hier laden: yfinance is alleen nodig voor echte data
+        import yfinance as yf
+        
+        def download(start, end):
+            return yf.download(symbols, start=start, end=end, interval=interval,
+                               threads=True, progress=False, group_by='ticker')
+        
+        # Lange intraday periodes in stukken ophalen
+        chunk_days = FETCH_CHUNK_DAYS.get(interval)
+        if not chunk_days:
+            return download(start_date, end_date)
+        
+        chunks = []
+        chunk_start = pd.Timestamp(start_date)
+        end = pd.Timestamp(end_date)
+        while chunk_start < end:
+            chunk_end = min(chunk_start + pd.Timedelta(days=chunk_days), end)
+            chunks.append(download(chunk_start, chunk_end))
+            chunk_start = chunk_end
+        return pd.concat(chunks)
     
     def generate_test_data(self, start_date, end_date, base_price=50000):
         """Genereer test data voor backtesting"""
-        dates = pd.date_range(start=start_date, end=end_date, freq='1H')
-        n_periods = len(dates)
-        
-        np.random.seed(42)
-        returns = np.random.normal(0.0001, 0.02, n_periods)
-        prices = base_price * np.exp(np.cumsum(returns))
+        dates_ns, prices, volume = _generate_test_arrays(start_date, end_date, base_price)
         
         df = pd.DataFrame({
-            'timestamp': dates,
+            'timestamp': pd.DatetimeIndex(dates_ns),
             'open': prices * 0.999,
             'high': prices * 1.005,
             'low': prices * 0.995,
             'close': prices,
-            'volume': np.random.lognormal(8, 1, n_periods)
-        })
+            'volume': volume
+        }).astype({column: OHLCV_DTYPE for column in ('open', 'high', 'low', 'close', 'volume')})
         
         df.set_index('timestamp', inplace=True)
         return df
     
     def backtest_grid_strategy(self, data, strategy_params):
         """Backtest een grid trading strategie"""
-        df = data.copy()
+        close = data['close'].to_numpy(dtype=OHLCV_DTYPE)
+        equity, trades, portfolio = self.backtest_arrays(close, strategy_params)
+        
+        # Bereken metrics
+        results = self.calculate_metrics(equity, trades)
         
+        # Equity curve blijft kolomsgewijs; alleen de trades worden records
+        return {
+            'equity_curve': {
+                'timestamp': data.index.values,
+                'value': equity,
+                'price': close
+            },
+            'trades': self.trades_frame(trades, data.index).to_dict('records'),
+            'portfolio': portfolio,
+            'metrics': results
+        }
+    
+    def run_grid_backtest(self, data, strategy_params):
+        """Draai de grid simulatie; equity en trades als kolom-DataFrames"""
+        close = data['close'].to_numpy(dtype=OHLCV_DTYPE)
+        equity, trades, portfolio = self.backtest_arrays(close, strategy_params)
+        
+        equity_df = pd.DataFrame(
+            {'value': equity, 'price': close},
+            index=data.index.rename('timestamp')
+        )
+        return equity_df, self.trades_frame(trades, data.index), portfolio
+    
+    def backtest_metrics(self, close, strategy_params):
+        """Alleen de metrics van één backtest; voor parameter sweeps"""
+        equity, trades, _ = self.backtest_arrays(close, strategy_params)
+        return self.calculate_metrics(equity, trades)
+    
+    def backtest_arrays(self, close, strategy_params):
+        """Grid simulatie op een voorbereide close array; equity array en TRADE_DTYPE trades"""
         # Strategy parameters
         grid_range_pct = strategy_params.get('grid_range_pct', 0.10)
         num_grids = strategy_params.get('num_grids', 20)
         order_size_usdt = strategy_params.get('order_size', 100)
         fee_rate = strategy_params.get('fee_rate', 0.001)
         
-        # Initialiseer portfolio
-        portfolio = {
-            'cash': self.initial_capital,
-            'positions': 0,
-            'total_value': self.initial_capital
-        }
+        # Grid ligt relatief rond de prijs, dus welke levels geraakt worden
+        # (binnen 0.1% van de prijs) hangt niet van de prijs af
+        rel_levels = np.linspace(1 - grid_range_pct, 1 + grid_range_pct, num_grids)
+        hit_levels = rel_levels[np.abs(rel_levels - 1) < 0.001 * rel_levels]
         
-        trades = []
-        equity_curve = []
+        trades = np.empty(len(close) * len(hit_levels), dtype=TRADE_DTYPE)
+        n_trades, equity, cash, positions = _grid_backtest_loop(
+            close, hit_levels, float(self.initial_capital),
+            float(order_size_usdt), float(fee_rate), trades
+        )
+        trades = trades[:n_trades]
         
-        # Voor elke tijdsstap
-        for i in range(len(df)):
-            current_price = df['close'].iloc[i]
-            
-            # Bereken grid rond huidige prijs
-            lower = current_price * (1 - grid_range_pct)
-            upper = current_price * (1 + grid_range_pct)
-            grid_levels = np.linspace(lower, upper, num_grids)
-            
-            # Check voor grid hits
-            for grid_price in grid_levels:
-                # Simuleer order matching
-                if abs(current_price - grid_price) / grid_price < 0.001:
-                    
-                    if current_price <= grid_price:
-                        # Buy order
-                        amount = order_size_usdt / grid_price
-                        cost = amount * grid_price * (1 + fee_rate)
-                        
-                        if portfolio['cash'] >= cost:
-                            portfolio['cash'] -= cost
-                            portfolio['positions'] += amount
-                            
-                            trades.append({
-                                'timestamp': df.index[i],
-                                'side': 'buy',
-                                'price': grid_price,
-                                'amount': amount,
-                                'fee': amount * grid_price * fee_rate,
-                                'profit': 0
-                            })
-                    
-                    else:
-                        # Sell order
-                        if portfolio['positions'] > 0:
-                            sell_amount = min(portfolio['positions'], order_size_usdt / grid_price)
-                            revenue = sell_amount * grid_price * (1 - fee_rate)
-                            portfolio['cash'] += revenue
-                            portfolio['positions'] -= sell_amount
-                            
-                            # Bereken profit (vereenvoudigd)
-                            avg_buy_price = sum([t['price'] for t in trades if t['side'] == 'buy']) / len([t for t in trades if t['side'] == 'buy']) if any(t['side'] == 'buy' for t in trades) else grid_price
-                            profit = (grid_price - avg_buy_price) * sell_amount
-                            
-                            trades.append({
-                                'timestamp': df.index[i],
-                                'side': 'sell',
-                                'price': grid_price,
-                                'amount': sell_amount,
-                                'fee': sell_amount * grid_price * fee_rate,
-                                'profit': profit
-                            })
-            
-            # Update portfolio waarde
-            portfolio_value = portfolio['cash'] + portfolio['positions'] * current_price
-            equity_curve.append({
-                'timestamp': df.index[i],
-                'value': portfolio_value,
-                'price': current_price
-            })
-        
-        # Bereken metrics
-        results = self.calculate_metrics(pd.DataFrame(equity_curve), trades)
-        
-        return {
-            'equity_curve': equity_curve,
-            'trades': trades,
-            'portfolio': portfolio,
-            'metrics': results
+        portfolio = {
+            'cash': cash,
+            'positions': positions,
+            'total_value': equity[-1] if len(equity) else self.initial_capital
         }
+        
+        return equity, trades, portfolio
     
-    def calculate_metrics(self, equity_curve_df, trades):
-        """Bereken prestatiemetrics"""
-        if len(equity_curve_df) < 2:
+    def trades_frame(self, trades, timestamps):
+        """Zet de trade records van backtest_arrays om naar een DataFrame"""
+        return pd.DataFrame({
+            'timestamp': timestamps[trades['index']],
+            'side': np.where(trades['side'] == 0, 'buy', 'sell'),
+            'price': trades['price'],
+            'amount': trades['amount'],
+            'fee': trades['fee'],
+            'profit': trades['profit']
+        })
+    
+    def calculate_metrics(self, equity_values, trades):
+        """Bereken prestatiemetrics uit de equity waarden en de trade records"""
+        if len(equity_values) < 2:
             return {}
         
-        returns = equity_curve_df['value'].pct_change().dropna()
+        values = np.asarray(equity_values, dtype=np.float64)
+        returns = np.diff(values) / values[:-1]
+        returns = returns[np.isfinite(returns)]
         
         # Basis metrics
-        total_return = (equity_curve_df['value'].iloc[-1] / equity_curve_df['value'].iloc[0] - 1) * 100
+        total_return = (values[-1] / values[0] - 1) * 100
         
         # Sharpe ratio
         sharpe = 0
-        if len(returns) > 1 and returns.std() != 0:
-            sharpe = (returns.mean() / returns.std()) * np.sqrt(365*24)
+        if len(returns) > 1:
+            std = returns.std(ddof=1)
+            if std != 0:
+                sharpe = (returns.mean() / std) * np.sqrt(365*24)
         
         # Max drawdown
-        rolling_max = equity_curve_df['value'].expanding().max()
-        drawdown = (equity_curve_df['value'] - rolling_max) / rolling_max
-        max_dd = drawdown.min() * 100
+        max_dd = _max_drawdown(values) * 100
         
         # Trade metrics
-        if trades:
-            trades_df = pd.DataFrame(trades)
-            if 'profit' in trades_df.columns:
-                win_rate = (trades_df['profit'] > 0).mean() * 100
-                profit_factor = abs(trades_df[trades_df['profit'] > 0]['profit'].sum() / trades_df[trades_df['profit'] < 0]['profit'].sum()) if trades_df[trades_df['profit'] < 0]['profit'].sum() != 0 else float('inf')
-            else:
-                win_rate = profit_factor = 0
-        else:
-            win_rate = profit_factor = 0
+        profits = np.asarray(trades['profit'])
+        win_rate = profit_factor = 0
+        if len(profits):
+            win_rate = (profits > 0).mean() * 100
+            gains = profits[profits > 0].sum()
+            losses = profits[profits < 0].sum()
+            profit_factor = abs(gains / losses) if losses != 0 else float('inf')
         
         return {
             'total_return_pct': total_return,
@@ -181,30 +508,106 @@ class Backtester:
             'max_drawdown_pct': max_dd,
             'win_rate_pct': win_rate,
             'profit_factor': profit_factor,
-            'total_trades': len(trades)
+            'total_trades': len(profits)
         }
     
-    def optimize_parameters(self, data, param_grid):
-        """Voer parameter optimalisatie uit"""
+    def optimize_parameters(self, data, param_grid, n_jobs=-1, mode='grid',
+                            n_iter=None, refine=False, seed=None):
+        """Voer parameter optimalisatie uit (volledig grid of random search, optioneel verfijnd)"""
         best_params = None
         best_metric = -np.inf
-        results = []
         
-        for params in self.param_generator(param_grid):
-            result = self.backtest_grid_strategy(data, params)
+        # Data één keer voorbereiden voor alle combinaties
+        close = data['close'].to_numpy(dtype=OHLCV_DTYPE)
+        
+        if mode == 'random':
+            param_list = self.random_param_sample(param_grid, n_iter or 50, seed)
+        else:
+            param_list = list(self.param_generator(param_grid))
+        results = self.evaluate_params(close, param_list, n_jobs)
+        
+        # Coarse-to-fine: fijner grid rond het beste punt van de eerste ronde
+        if refine and results:
+            best = max(results, key=lambda r: r['metrics'].get('sharpe_ratio', 0))
+            fine_grid = self.refine_param_grid(param_grid, best['params'])
+            results += self.evaluate_params(
+                close, list(self.param_generator(fine_grid)), n_jobs
+            )
+        
+        for result in results:
             metric = result['metrics'].get('sharpe_ratio', 0)
-            
-            results.append({
-                'params': params,
-                'metrics': result['metrics']
-            })
-            
             if metric > best_metric:
                 best_metric = metric
-                best_params = params
+                best_params = result['params']
         
         return best_params, results
     
+    def evaluate_params(self, close, param_list, n_jobs=-1):
+        """Backtest parameter sets parallel over alle cores"""
+        # Combinaties zijn onafhankelijk; joblib memmapt de close array naar de workers
+        all_metrics = Parallel(n_jobs=n_jobs, backend='loky')(
+            delayed(self.backtest_metrics)(close, params) for params in param_list
+        )
+        return [
+            {'params': params, 'metrics': metrics}
+            for params, metrics in zip(param_list, all_metrics)
+        ]
+    
+    def random_param_sample(self, param_grid, n_iter, seed=None):
+        """Trek n_iter unieke combinaties uit het grid zonder het volledig uit te schrijven"""
+        keys = list(param_grid.keys())
+        values = [list(v) for v in param_grid.values()]
+        shape = tuple(len(v) for v in values)
+        total = int(np.prod(shape))
+        
+        if n_iter >= total:
+            return list(self.param_generator(param_grid))
+        
+        rng = np.random.default_rng(seed)
+        flat = rng.choice(total, size=n_iter, replace=False)
+        return [
+            {key: values[k][idx] for k, key in enumerate(keys)}
+            for idx in zip(*np.unravel_index(flat, shape))
+        ]
+    
+    def refine_param_grid(self, param_grid, best_params, steps=5):
+        """Fijner grid tussen de buren van de beste waarde per numerieke parameter"""
+        fine_grid = {}
+        for key, values in param_grid.items():
+            values = sorted(set(values))
+            best = best_params[key]
+            
+            if len(values) < 2 or not isinstance(best, (int, float, np.number)):
+                fine_grid[key] = [best]
+                continue
+            
+            idx = values.index(best)
+            low = values[max(idx - 1, 0)]
+            high = values[min(idx + 1, len(values) - 1)]
+            fine = np.linspace(low, high, steps)
+            if isinstance(best, (int, np.integer)):
+                fine = np.unique(fine.round().astype(int))
+            fine_grid[key] = fine.tolist()
+        
+        return fine_grid
+    
+    def batch_backtest(self, data, param_sets, fee_rate=0.001):
+        """Backtest alle parameter sets (kolommen: grid_range_pct, num_grids, order_size) op dezelfde data"""
+        param_sets = np.asarray(param_sets, dtype=np.float64)
+        close = data['close'].to_numpy(dtype=OHLCV_DTYPE)
+        
+        # Eén kernel voor de hele sweep; de close array wordt door alle sets gedeeld
+        param_matrix = np.column_stack([param_sets[:, :3], np.full(len(param_sets), fee_rate)])
+        out = _batch_grid_backtest(close, param_matrix, float(self.initial_capital))
+        
+        return {
+            'total_return_pct': out[:, 0],
+            'sharpe_ratio': out[:, 1],
+            'max_drawdown_pct': out[:, 2],
+            'win_rate_pct': out[:, 3],
+            'total_trades': out[:, 4].astype(int)
+        }
+    
     def param_generator(self, param_grid):
         """Genereer parameter combinaties"""
         from itertools import product
@@ -1,98 +1,255 @@
-import ccxt
+import asyncio
+import importlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
 import numpy as np
 from datetime import datetime
 import hashlib
+import os
+import sys
+from pathlib import Path
 import hmac
 import time
-import json
-from typing import Dict, List, Optional, Tuple
+import orjson
+import logging
+from typing import Dict, FrozenSet, List, Optional, Tuple
 import warnings
 warnings.filterwarnings('ignore')
 
+logger = logging.getLogger(__name__)
+
+# Tickers jonger dan dit (seconden) worden uit de cache geserveerd
+TICKER_TTL = 2.0
+
+@dataclass(frozen=True, slots=True)
+class ExchangeSpec:
+    """Wat een exchange ondersteunt en welke credentials nodig zijn"""
+    spot: bool
+    futures: bool
+    margin: bool
+    requires: FrozenSet[str]
+    class_name: str
+
+@lru_cache(maxsize=None)
+def _get_exchange_class(class_name: str, module_name: str = 'ccxt'):
+    """Laad de ccxt class pas bij eerste gebruik; ccxt importeren kost een paar honderd ms
+    
+    module_name: 'ccxt' (sync), 'ccxt.async_support' of 'ccxt.pro' (WebSocket)
+    """
+    return getattr(importlib.import_module(module_name), class_name)
+
+# Cache op schijf voor exchange data; TTL in seconden per endpoint
+CACHE_DIR = Path('.cache')
+CACHE_TTL = {
+    'ticker': 2,
+    'order_book': 2,
+    'ohlcv': 3600,
+    'markets': 86400
+}
+
+class FileCache:
+    """JSON cache op schijf: {root}/{exchange}/{endpoint}/{md5(params)}.json"""
+    
+    def __init__(self, root: Path = CACHE_DIR):
+        self.root = Path(root)
+    
+    @staticmethod
+    def make_key(*args, **kwargs) -> str:
+        """Stabiele key voor een set parameters"""
+        return hashlib.md5(f"{args}|{sorted(kwargs.items())}".encode()).hexdigest()
+    
+    def _path(self, exchange_name: str, endpoint: str, key: str) -> Path:
+        return self.root / exchange_name / endpoint / f"{key}.json"
+    
+    def get(self, exchange_name: str, endpoint: str, key: str, ttl: float):
+        """Geef de opgeslagen waarde terug als die jonger is dan ttl, anders None"""
+        path = self._path(exchange_name, endpoint, key)
+        try:
+            entry = orjson.loads(path.read_bytes())
+        except (OSError, ValueError):
+            return None
+        
+        if time.time() - entry['fetched_at'] >= ttl:
+            return None
+        return entry['value']
+    
+    def set(self, exchange_name: str, endpoint: str, key: str, value):
+        """Sla een waarde op; schrijven via een tijdelijk bestand zodat lezers nooit half werk zien"""
+        path = self._path(exchange_name, endpoint, key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+            tmp.write_bytes(orjson.dumps(
+                {'fetched_at': time.time(), 'value': value},
+                option=orjson.OPT_SERIALIZE_NUMPY,
+                default=str
+            ))
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning("Fout bij schrijven cache %s: %s", path, e)
+
+# Grootte van de connection pool per exchange sessie
+HTTP_POOL_SIZE = 32
+
+def _make_http_session():
+    """requests sessie met een grote keep-alive pool en retries op tijdelijke fouten"""
+    session = requests.Session()
+    # Alleen idempotente requests worden herhaald (Retry slaat POST standaard over)
+    retry = Retry(total=3, backoff_factor=0.2, status_forcelist=[429, 502, 503, 504])
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE, max_retries=retry)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+# Burst grootte van de token bucket per exchange
+RATE_LIMIT_BURST = 5
+
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blokkeert tot er een token vrij is,
+    acquire_async() wacht zonder de event loop te blokkeren"""
+    
+    def __init__(self, capacity: float, refill_rate: float):
+        self.capacity = capacity
+        self.refill_rate = refill_rate  # tokens per seconde
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def _try_take(self) -> float:
+        """Neem een token als dat kan; geeft 0 terug, of anders de wachttijd tot het volgende token"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_rate)
+            self.updated = now
+            
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            
+            return (1 - self.tokens) / self.refill_rate
+    
+    def acquire(self):
+        """Neem een token; wacht zo nodig tot er een bijgevuld is"""
+        while (wait := self._try_take()):
+            time.sleep(wait)
+    
+    async def acquire_async(self):
+        """Zelfde als acquire(), maar wacht met asyncio.sleep"""
+        while (wait := self._try_take()):
+            await asyncio.sleep(wait)
+
 class ExchangeManager:
     """Beheer meerdere cryptocurrency exchanges"""
     
     SUPPORTED_EXCHANGES = {
-        'binance': {
-            'spot': True,
-            'futures': True,
-            'margin': True,
-            'requires': ['api_key', 'api_secret'],
-            'class': ccxt.binance
-        },
-        'bybit': {
-            'spot': True,
-            'futures': True,
-            'margin': False,
-            'requires': ['api_key', 'api_secret'],
-            'class': ccxt.bybit
-        },
-        'kucoin': {
-            'spot': True,
-            'futures': True,
-            'margin': True,
-            'requires': ['api_key', 'api_secret', 'password'],
-            'class': ccxt.kucoin
-        },
-        'okx': {
-            'spot': True,
-            'futures': True,
-            'margin': True,
-            'requires': ['api_key', 'api_secret', 'password'],
-            'class': ccxt.okx
-        },
-        'coinbase': {
-            'spot': True,
-            'futures': False,
-            'margin': False,
-            'requires': ['api_key', 'api_secret'],
-            'class': ccxt.coinbase
-        },
-        'huobi': {
-            'spot': True,
-            'futures': True,
-            'margin': True,
-            'requires': ['api_key', 'api_secret'],
-            'class': ccxt.huobi
-        },
-        'gateio': {
-            'spot': True,
-            'futures': True,
-            'margin': True,
-            'requires': ['api_key', 'api_secret'],
-            'class': ccxt.gateio
-        },
-        'mexc': {
-            'spot': True,
-            'futures': True,
-            'margin': True,
-            'requires': ['api_key', 'api_secret'],
-            'class': ccxt.mexc
-        }
+        'binance': ExchangeSpec(
+            spot=True,
+            futures=True,
+            margin=True,
+            requires=frozenset({'api_key', 'api_secret'}),
+            class_name='binance'
+        ),
+        'bybit': ExchangeSpec(
+            spot=True,
+            futures=True,
+            margin=False,
+            requires=frozenset({'api_key', 'api_secret'}),
+            class_name='bybit'
+        ),
+        'kucoin': ExchangeSpec(
+            spot=True,
+            futures=True,
+            margin=True,
+            requires=frozenset({'api_key', 'api_secret', 'password'}),
+            class_name='kucoin'
+        ),
+        'okx': ExchangeSpec(
+            spot=True,
+            futures=True,
+            margin=True,
+            requires=frozenset({'api_key', 'api_secret', 'password'}),
+            class_name='okx'
+        ),
+        'coinbase': ExchangeSpec(
+            spot=True,
+            futures=False,
+            margin=False,
+            requires=frozenset({'api_key', 'api_secret'}),
+            class_name='coinbase'
+        ),
+        'huobi': ExchangeSpec(
+            spot=True,
+            futures=True,
+            margin=True,
+            requires=frozenset({'api_key', 'api_secret'}),
+            class_name='huobi'
+        ),
+        'gateio': ExchangeSpec(
+            spot=True,
+            futures=True,
+            margin=True,
+            requires=frozenset({'api_key', 'api_secret'}),
+            class_name='gateio'
+        ),
+        'mexc': ExchangeSpec(
+            spot=True,
+            futures=True,
+            margin=True,
+            requires=frozenset({'api_key', 'api_secret'}),
+            class_name='mexc'
+        )
     }
     
-    def __init__(self):
+    def __init__(self, use_cache: bool = True):
         self.exchanges = {}
         self.active_exchange = None
         self.balances = {}
         self.positions = {}
+        # Gedeelde pool voor fan-out over exchanges; geen threads per call aanmaken
+        self._pool = ThreadPoolExecutor(max_workers=16)
+        # Eén call tegelijk per exchange: de ccxt throttler van een sync instance is niet thread-safe
+        self._call_locks = {}
+        # Token bucket per exchange, zodat bursts uit verschillende code paden samen gethrottled worden
+        self._buckets = {}
+        # (exchange_name, symbol) -> (time.monotonic(), ticker)
+        self._ticker_cache = {}
+        # exchange_name -> quote -> base -> symbol, uit de markets van de exchange
+        self._quote_pairs = {}
+        # WebSocket streams (ccxt.pro) draaien op een eigen event loop in een achtergrondthread;
+        # _book is de lokale spiegel: exchange_name -> symbol -> laatste ticker
+        self._ws_loop = None
+        self._ws_instances = {}
+        # De async REST instances (instance_async) horen bij één vaste event loop; hun HTTP
+        # sessie mag niet door meerdere loops tegelijk gebruikt of tussendoor gesloten worden
+        self._async_loop = None
+        self._async_loop_lock = threading.Lock()
+        self._ws_tasks = {}
+        self._book = {}
+        # Exchange data op schijf, zodat een herstart niet alles opnieuw hoeft op te halen
+        self.file_cache = FileCache() if use_cache else None
         
     def add_exchange(self, exchange_name: str, credentials: dict, exchange_type: str = 'spot'):
         """Voeg een exchange toe met credentials"""
         if exchange_name not in self.SUPPORTED_EXCHANGES:
             raise ValueError(f"Exchange {exchange_name} niet ondersteund")
         
-        exchange_info = self.SUPPORTED_EXCHANGES[exchange_name]
+        spec = self.SUPPORTED_EXCHANGES[exchange_name]
         
         # Controleer vereiste credentials
-        for req in exchange_info['requires']:
-            if req not in credentials:
-                raise ValueError(f"{req} is vereist voor {exchange_name}")
+        missing = spec.requires - credentials.keys()
+        if missing:
+            raise ValueError(f"{', '.join(sorted(missing))} is vereist voor {exchange_name}")
         
         try:
             # Maak exchange instance
-            exchange_class = exchange_info['class']
+            exchange_class = _get_exchange_class(spec.class_name)
             
             config = {
                 'apiKey': credentials.get('api_key'),
@@ -101,40 +258,95 @@ class ExchangeManager:
                 'enableRateLimit': True
             }
             
-            if exchange_type == 'futures' and exchange_info['futures']:
+            if exchange_type == 'futures' and spec.futures:
                 config['options'] = {'defaultType': 'future'}
-            elif exchange_type == 'margin' and exchange_info['margin']:
+            elif exchange_type == 'margin' and spec.margin:
                 config['options'] = {'defaultType': 'margin'}
             
             exchange = exchange_class(config)
+            # Eigen sessie, zodat verbindingen en TLS hergebruikt worden bij parallelle calls
+            exchange.session = _make_http_session()
             
             # Test connectie
             exchange.fetch_time()
             
+            # Markets uit de cache voorkomt een zware load_markets bij elke start
+            markets = self._cached_call(exchange_name, 'markets', (exchange_type,), exchange.fetch_markets)
+            exchange.set_markets(markets)
+            self._quote_pairs[exchange_name] = self._build_quote_pairs(exchange.markets)
+            
             self.exchanges[exchange_name] = {
                 'instance': exchange,
+                # Async twin voor gelijktijdige requests over exchanges heen
+                'instance_async': _get_exchange_class(spec.class_name, 'ccxt.async_support')(config),
                 'type': exchange_type,
-                'credentials': credentials
+                'credentials': credentials,
+                'config': config
             }
             
+            self._call_locks[exchange_name] = threading.Semaphore(1)
+            self._buckets[exchange_name] = TokenBucket(
+                capacity=RATE_LIMIT_BURST,
+                refill_rate=1000.0 / (exchange.rateLimit or 1000)
+            )
             self.active_exchange = exchange_name
             
-            print(f"✅ Exchange {exchange_name} succesvol toegevoegd")
+            logger.info("Exchange %s succesvol toegevoegd", exchange_name)
             return True
             
-        except Exception as e:
-            print(f"❌ Fout bij toevoegen {exchange_name}: {str(e)}")
+        except Exception:
+            logger.exception("Fout bij toevoegen %s", exchange_name)
             return False
     
     def remove_exchange(self, exchange_name: str):
         """Verwijder een exchange"""
         if exchange_name in self.exchanges:
+            self.stop_streams(exchange_name)
+            if self._async_loop is not None:
+                self._run_async(self._close_async_instances([exchange_name]))
             del self.exchanges[exchange_name]
+            self._call_locks.pop(exchange_name, None)
+            self._buckets.pop(exchange_name, None)
+            self._quote_pairs.pop(exchange_name, None)
             if self.active_exchange == exchange_name:
                 self.active_exchange = list(self.exchanges.keys())[0] if self.exchanges else None
             return True
         return False
     
+    @staticmethod
+    def _build_quote_pairs(markets: dict):
+        """Spot paren per quote currency: {quote: {base: 'BASE/QUOTE'}}"""
+        quote_pairs = {}
+        for market in markets.values():
+            base, quote = market.get('base'), market.get('quote')
+            if base and quote and market.get('symbol') == f"{base}/{quote}":
+                quote_pairs.setdefault(quote, {})[base] = market['symbol']
+        return quote_pairs
+    
+    def _cached_call(self, exchange_name: str, endpoint: str, params: tuple, fetch):
+        """Voer fetch() uit, tenzij de file cache een vers genoeg resultaat heeft"""
+        if self.file_cache is None:
+            return fetch()
+        
+        key = FileCache.make_key(*params)
+        value = self.file_cache.get(exchange_name, endpoint, key, CACHE_TTL[endpoint])
+        if value is None:
+            value = fetch()
+            self.file_cache.set(exchange_name, endpoint, key, value)
+        return value
+    
+    @contextmanager
+    def _exchange_call(self, exchange_name: str):
+        """Omhul één ccxt call: wacht op een token en houd de call lock van de exchange vast"""
+        self._buckets[exchange_name].acquire()
+        with self._call_locks[exchange_name]:
+            yield
+    
+    def _throttled(self, exchange_name: str, func, *args, **kwargs):
+        """Roep een ccxt methode aan binnen _exchange_call"""
+        with self._exchange_call(exchange_name):
+            return func(*args, **kwargs)
+    
     def switch_exchange(self, exchange_name: str):
         """Wissel naar een andere exchange"""
         if exchange_name in self.exchanges:
@@ -157,33 +369,89 @@ class ExchangeManager:
         
         try:
             exchange = self.exchanges[exchange_name]['instance']
-            balance = exchange.fetch_balance()
-            
-            # Format balans
-            formatted_balance = {
-                'total': balance.get('total', {}),
-                'free': balance.get('free', {}),
-                'used': balance.get('used', {}),
-                'timestamp': datetime.now().isoformat()
-            }
+            with self._exchange_call(exchange_name):
+                balance = exchange.fetch_balance()
+            return self._store_balance(exchange_name, balance)
             
-            self.balances[exchange_name] = formatted_balance
-            return formatted_balance
+        except Exception:
+            logger.exception("Fout bij ophalen balans van %s", exchange_name)
+            return None
+    
+    async def fetch_balance_async(self, exchange_name: str):
+        """Haal balans op via de async instance van een exchange"""
+        if exchange_name not in self.exchanges:
+            return None
+        
+        try:
+            exchange = self.exchanges[exchange_name]['instance_async']
+            # Zelfde token bucket als de sync calls; de call lock is er alleen voor de sync instance
+            await self._buckets[exchange_name].acquire_async()
+            balance = await exchange.fetch_balance()
+            return self._store_balance(exchange_name, balance)
             
-        except Exception as e:
-            print(f"Fout bij ophalen balans van {exchange_name}: {str(e)}")
+        except Exception:
+            logger.exception("Fout bij ophalen balans van %s", exchange_name)
             return None
     
-    def fetch_all_balances(self):
-        """Haal balansen op van alle exchanges"""
-        all_balances = {}
+    def _store_balance(self, exchange_name: str, balance: dict):
+        """Format een ccxt balans en bewaar hem"""
+        formatted_balance = {
+            'total': balance.get('total', {}),
+            'free': balance.get('free', {}),
+            'used': balance.get('used', {}),
+            'timestamp': datetime.now().isoformat()
+        }
         
-        for exchange_name in self.exchanges:
-            balance = self.fetch_balance(exchange_name)
-            if balance:
-                all_balances[exchange_name] = balance
+        self.balances[exchange_name] = formatted_balance
+        return formatted_balance
+    
+    async def fetch_all_balances_async(self):
+        """Haal balansen op van alle exchanges tegelijk"""
+        exchange_names = list(self.exchanges)
+        
+        tasks = [asyncio.create_task(self.fetch_balance_async(name)) for name in exchange_names]
+        balances = await asyncio.gather(*tasks, return_exceptions=True)
+        
+        return {
+            name: balance
+            for name, balance in zip(exchange_names, balances)
+            if balance and not isinstance(balance, BaseException)
+        }
+    
+    async def _close_async_instances(self, exchange_names):
+        """Sluit de async instances (alleen op de async loop, zie _run_async)"""
+        await asyncio.gather(
+            *(self.exchanges[name]['instance_async'].close()
+              for name in exchange_names if name in self.exchanges),
+            return_exceptions=True
+        )
+    
+    def _run_async(self, coro):
+        """Voer coro uit op de vaste async loop en wacht op het resultaat.
+        
+        Alle gebruik van instance_async loopt via deze ene loop, zodat gelijktijdige
+        aanroepen uit verschillende threads dezelfde HTTP sessies veilig delen."""
+        with self._async_loop_lock:
+            if self._async_loop is None:
+                self._async_loop = asyncio.new_event_loop()
+                threading.Thread(target=self._async_loop.run_forever, name='exchange-async', daemon=True).start()
         
-        return all_balances
+        return asyncio.run_coroutine_threadsafe(coro, self._async_loop).result()
+    
+    def close_async(self):
+        """Sluit de async instances en stop de async loop"""
+        with self._async_loop_lock:
+            loop, self._async_loop = self._async_loop, None
+        
+        if loop is not None:
+            asyncio.run_coroutine_threadsafe(
+                self._close_async_instances(list(self.exchanges)), loop
+            ).result(timeout=10)
+            loop.call_soon_threadsafe(loop.stop)
+    
+    def fetch_all_balances(self):
+        """Haal balansen op van alle exchanges"""
+        return self._run_async(self.fetch_all_balances_async())
     
     def get_total_portfolio_value(self, quote_currency='USDT'):
         """Bereken totale portefeuille waarde over alle exchanges"""
@@ -191,35 +459,39 @@ class ExchangeManager:
         portfolio_details = {}
         
         for exchange_name, balance in self.balances.items():
-            exchange_value = 0
-            exchange_details = []
-            
-            for currency, amount in balance['total'].items():
-                if amount > 0:
-                    try:
-                        # Haal ticker op voor prijsconversie
-                        if currency != quote_currency:
-                            symbol = f"{currency}/{quote_currency}"
-                            ticker = self.fetch_ticker(symbol, exchange_name)
-                            if ticker:
-                                value = amount * ticker['last']
-                                exchange_value += value
-                                exchange_details.append({
-                                    'currency': currency,
-                                    'amount': amount,
-                                    'price': ticker['last'],
-                                    'value': value
-                                })
-                        else:
-                            exchange_value += amount
-                            exchange_details.append({
-                                'currency': currency,
-                                'amount': amount,
-                                'price': 1,
-                                'value': amount
-                            })
-                    except:
-                        continue
+            holdings = {c: a for c, a in balance['total'].items() if a and a > 0}
+            quote_amount = holdings.pop(quote_currency, 0)
+            
+            # Alleen paren die de exchange echt noteert; geen requests voor onbekende symbolen
+            pairs = self._quote_pairs.get(exchange_name, {}).get(quote_currency, {})
+            listed = [(currency, pairs[currency]) for currency in holdings if currency in pairs]
+            
+            # Alle prijzen in één batch call, daarna in één keer vermenigvuldigen
+            symbols = [symbol for _, symbol in listed]
+            tickers = self.fetch_tickers(symbols, exchange_name) if symbols else {}
+            
+            priced = [
+                (currency, symbol) for currency, symbol in listed
+                if tickers.get(symbol) and tickers[symbol].get('last') is not None
+            ]
+            amounts = np.fromiter((holdings[c] for c, _ in priced), dtype=np.float64, count=len(priced))
+            last_prices = np.fromiter((tickers[s]['last'] for _, s in priced), dtype=np.float64, count=len(priced))
+            values = amounts * last_prices
+            
+            exchange_value = float(values.sum()) + quote_amount
+            exchange_details = [
+                {'currency': currency, 'amount': amount, 'price': price, 'value': value}
+                for (currency, _), amount, price, value in zip(
+                    priced, amounts.tolist(), last_prices.tolist(), values.tolist()
+                )
+            ]
+            if quote_amount:
+                exchange_details.append({
+                    'currency': quote_currency,
+                    'amount': quote_amount,
+                    'price': 1,
+                    'value': quote_amount
+                })
             
             portfolio_details[exchange_name] = {
                 'value': exchange_value,
@@ -240,14 +512,78 @@ class ExchangeManager:
         if exchange_name not in self.exchanges:
             return None
         
+        key = (exchange_name, symbol)
+        cached = self._ticker_cache.get(key)
+        if cached and time.monotonic() - cached[0] < TICKER_TTL:
+            return cached[1]
+        
         try:
             exchange = self.exchanges[exchange_name]['instance']
-            ticker = exchange.fetch_ticker(symbol)
+            ticker = self._cached_call(
+                exchange_name, 'ticker', (symbol,),
+                lambda: self._throttled(exchange_name, exchange.fetch_ticker, symbol)
+            )
+            self._ticker_cache[key] = (time.monotonic(), ticker)
             return ticker
-        except Exception as e:
-            print(f"Fout bij ophalen ticker {symbol} van {exchange_name}: {str(e)}")
+        except Exception:
+            logger.exception("Fout bij ophalen ticker %s van %s", symbol, exchange_name)
             return None
     
+    def fetch_tickers(self, symbols: List[str], exchange_name: str = None):
+        """Haal tickers voor meerdere symbolen op, in één call als de exchange dat ondersteunt"""
+        exchange_name = exchange_name or self.active_exchange
+        
+        if exchange_name not in self.exchanges:
+            return {}
+        
+        now = time.monotonic()
+        tickers = {}
+        missing = []
+        for symbol in symbols:
+            cached = self._ticker_cache.get((exchange_name, symbol))
+            if cached and now - cached[0] < TICKER_TTL:
+                tickers[symbol] = cached[1]
+            else:
+                missing.append(symbol)
+        
+        if not missing:
+            return tickers
+        
+        exchange = self.exchanges[exchange_name]['instance']
+        if not exchange.has.get('fetchTickers'):
+            for symbol in missing:
+                ticker = self.fetch_ticker(symbol, exchange_name)
+                if ticker:
+                    tickers[symbol] = ticker
+            return tickers
+        
+        try:
+            with self._exchange_call(exchange_name):
+                fetched = exchange.fetch_tickers(missing)
+            
+            now = time.monotonic()
+            for symbol, ticker in fetched.items():
+                self._ticker_cache[(exchange_name, symbol)] = (now, ticker)
+            tickers.update(fetched)
+        except Exception as e:
+            # Eén onbekend symbool laat de hele batch falen; dan per symbool
+            logger.warning("Fout bij ophalen tickers van %s: %s", exchange_name, e)
+            for symbol in missing:
+                ticker = self.fetch_ticker(symbol, exchange_name)
+                if ticker:
+                    tickers[symbol] = ticker
+        
+        return tickers
+    
+    def invalidate_ticker_cache(self, symbol: str = None):
+        """Leeg de ticker cache, voor één symbool of helemaal"""
+        if symbol is None:
+            self._ticker_cache.clear()
+            return
+        
+        for key in [key for key in self._ticker_cache if key[1] == symbol]:
+            self._ticker_cache.pop(key, None)
+    
     def create_order(self, symbol: str, order_type: str, side: str, amount: float, 
                     price: float = None, exchange_name: str = None, params: dict = None):
         """Plaats een order op een exchange"""
@@ -264,24 +600,29 @@ class ExchangeManager:
             if self.exchanges[exchange_name]['type'] == 'futures':
                 order_params['type'] = 'future'
             
-            order = exchange.create_order(
-                symbol=symbol,
-                type=order_type,
-                side=side,
-                amount=amount,
-                price=price,
-                params=order_params
-            )
+            with self._exchange_call(exchange_name):
+                order = exchange.create_order(
+                    symbol=symbol,
+                    type=order_type,
+                    side=side,
+                    amount=amount,
+                    price=price,
+                    params=order_params
+                )
             
             return order
             
-        except Exception as e:
-            print(f"Fout bij plaatsen order op {exchange_name}: {str(e)}")
+        except Exception:
+            logger.exception("Fout bij plaatsen order op %s", exchange_name)
             return None
     
     def fetch_ohlcv(self, symbol: str, timeframe: str = '1h', 
-                   limit: int = 100, exchange_name: str = None):
-        """Haal OHLCV data op"""
+                   limit: int = 100, exchange_name: str = None, as_dataframe: bool = False):
+        """Haal OHLCV data op
+        
+        Geeft (timestamps als datetime64[ms], float64 array met open/high/low/close/volume
+        kolommen) terug, of een DataFrame met as_dataframe=True.
+        """
         exchange_name = exchange_name or self.active_exchange
         
         if exchange_name not in self.exchanges:
@@ -289,15 +630,30 @@ class ExchangeManager:
         
         try:
             exchange = self.exchanges[exchange_name]['instance']
-            ohlcv = exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
+            ohlcv = self._cached_call(
+                exchange_name, 'ohlcv', (symbol, timeframe, limit),
+                lambda: self._throttled(exchange_name, exchange.fetch_ohlcv, symbol, timeframe, limit=limit)
+            )
             
-            df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+            arr = np.asarray(ohlcv, dtype=np.float64).reshape(-1, 6)
+            timestamps = arr[:, 0].astype(np.int64).view('datetime64[ms]')
+            values = arr[:, 1:]
             
-            return df
+            if not as_dataframe:
+                return timestamps, values
             
-        except Exception as e:
-            print(f"Fout bij ophalen OHLCV van {exchange_name}: {str(e)}")
+            # Kolomsgewijs opbouwen, zonder inferentie per rij
+            return pd.DataFrame({
+                'timestamp': timestamps,
+                'open': values[:, 0],
+                'high': values[:, 1],
+                'low': values[:, 2],
+                'close': values[:, 3],
+                'volume': values[:, 4]
+            })
+            
+        except Exception:
+            logger.exception("Fout bij ophalen OHLCV van %s", exchange_name)
             return None
     
     def get_exchange_info(self, exchange_name: str):
@@ -317,12 +673,84 @@ class ExchangeManager:
         
         return info
     
+    def watch_tickers(self, symbol: str, exchange_names: List[str] = None):
+        """Houd de ticker van symbol bij via WebSocket streams in plaats van REST polling"""
+        if self._ws_loop is None:
+            self._ws_loop = asyncio.new_event_loop()
+            threading.Thread(target=self._ws_loop.run_forever, name='exchange-ws', daemon=True).start()
+        
+        for exchange_name in exchange_names or list(self.exchanges):
+            key = (exchange_name, symbol)
+            if exchange_name in self.exchanges and key not in self._ws_tasks:
+                self._ws_tasks[key] = asyncio.run_coroutine_threadsafe(
+                    self._stream_ticker(exchange_name, symbol), self._ws_loop
+                )
+    
+    async def _stream_ticker(self, exchange_name: str, symbol: str):
+        """Schrijf elke ticker update van de stream in de lokale spiegel"""
+        # Alleen aangeroepen op de WebSocket loop, dus geen lock nodig rond _ws_instances
+        exchange = self._ws_instances.get(exchange_name)
+        if exchange is None:
+            spec = self.SUPPORTED_EXCHANGES[exchange_name]
+            exchange = _get_exchange_class(spec.class_name, 'ccxt.pro')(self.exchanges[exchange_name]['config'])
+            self._ws_instances[exchange_name] = exchange
+        
+        while True:
+            try:
+                ticker = await exchange.watch_ticker(symbol)
+                self._book.setdefault(exchange_name, {})[symbol] = ticker
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Fout in ticker stream %s van %s", symbol, exchange_name)
+                # Geen verouderde prijs laten staan; tot de stream herstelt via REST
+                self._book.get(exchange_name, {}).pop(symbol, None)
+                await asyncio.sleep(1)
+    
+    def stop_streams(self, exchange_name: str = None):
+        """Stop de WebSocket streams van één exchange, of allemaal"""
+        if self._ws_loop is None:
+            return
+        
+        for key in [key for key in self._ws_tasks if exchange_name in (None, key[0])]:
+            self._ws_tasks.pop(key).cancel()
+        
+        names = [exchange_name] if exchange_name else list(self._ws_instances)
+        instances = [self._ws_instances.pop(name) for name in names if name in self._ws_instances]
+        for name in names:
+            self._book.pop(name, None)
+        
+        async def close_instances():
+            await asyncio.gather(*(instance.close() for instance in instances), return_exceptions=True)
+        
+        asyncio.run_coroutine_threadsafe(close_instances(), self._ws_loop).result(timeout=10)
+        
+        if not self._ws_tasks:
+            self._ws_loop.call_soon_threadsafe(self._ws_loop.stop)
+            self._ws_loop = None
+    
     def compare_prices(self, symbol: str):
         """Vergelijk prijzen tussen alle exchanges"""
-        prices = {}
-        
+        # Exchanges met een actieve stream komen direct uit de lokale spiegel; één .get()
+        # per exchange, want de WebSocket thread kan een entry tussendoor weghalen
+        tickers = {}
         for exchange_name in self.exchanges:
-            ticker = self.fetch_ticker(symbol, exchange_name)
+            ticker = self._book.get(exchange_name, {}).get(symbol)
+            if ticker is not None:
+                tickers[exchange_name] = ticker
+        
+        # De rest parallel via REST: wachttijd is de traagste exchange, niet de som
+        futures = {
+            self._pool.submit(self.fetch_ticker, symbol, exchange_name): exchange_name
+            for exchange_name in self.exchanges
+            if exchange_name not in tickers
+        }
+        
+        for future in as_completed(futures):
+            tickers[futures[future]] = future.result()
+        
+        prices = {}
+        for exchange_name, ticker in tickers.items():
             if ticker:
                 prices[exchange_name] = {
                     'bid': ticker['bid'],
@@ -337,43 +765,33 @@ class ExchangeManager:
         """Zoek arbitrage mogelijkheden tussen exchanges"""
         prices = self.compare_prices(symbol)
         
-        opportunities = []
-        
-        exchanges = list(prices.keys())
-        for i in range(len(exchanges)):
-            for j in range(i+1, len(exchanges)):
-                exch1 = exchanges[i]
-                exch2 = exchanges[j]
-                
-                # Check voor arbitrage: kopen op laagste ask, verkopen op hoogste bid
-                if prices[exch1]['ask'] < prices[exch2]['bid']:
-                    profit_pct = (prices[exch2]['bid'] - prices[exch1]['ask']) / prices[exch1]['ask'] * 100
-                    
-                    if profit_pct > min_profit_pct:
-                        opportunities.append({
-                            'buy_exchange': exch1,
-                            'sell_exchange': exch2,
-                            'buy_price': prices[exch1]['ask'],
-                            'sell_price': prices[exch2]['bid'],
-                            'profit_pct': profit_pct,
-                            'symbol': symbol
-                        })
-                
-                # Omgekeerde richting
-                if prices[exch2]['ask'] < prices[exch1]['bid']:
-                    profit_pct = (prices[exch1]['bid'] - prices[exch2]['ask']) / prices[exch2]['ask'] * 100
-                    
-                    if profit_pct > min_profit_pct:
-                        opportunities.append({
-                            'buy_exchange': exch2,
-                            'sell_exchange': exch1,
-                            'buy_price': prices[exch2]['ask'],
-                            'sell_price': prices[exch1]['bid'],
-                            'profit_pct': profit_pct,
-                            'symbol': symbol
-                        })
-        
-        return sorted(opportunities, key=lambda x: x['profit_pct'], reverse=True)
+        if len(prices) < 2:
+            return []
+        
+        names = list(prices)
+        asks = np.array([prices[name]['ask'] for name in names], dtype=np.float64)
+        bids = np.array([prices[name]['bid'] for name in names], dtype=np.float64)
+        
+        # profit[i, j]: kopen op exchange i (ask), verkopen op exchange j (bid)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            profit = (bids[None, :] - asks[:, None]) / asks[:, None] * 100.0
+        np.fill_diagonal(profit, np.nan)
+        
+        buy_idx, sell_idx = np.nonzero(profit > min_profit_pct)
+        profit_pct = profit[buy_idx, sell_idx]
+        order = np.argsort(-profit_pct, kind='stable')
+        
+        return [
+            {
+                'buy_exchange': names[i],
+                'sell_exchange': names[j],
+                'buy_price': prices[names[i]]['ask'],
+                'sell_price': prices[names[j]]['bid'],
+                'profit_pct': float(profit_pct[k]),
+                'symbol': symbol
+            }
+            for k, i, j in zip(order.tolist(), buy_idx[order].tolist(), sell_idx[order].tolist())
+        ]
     
     def execute_arbitrage(self, opportunity: dict, amount: float):
         """Voer arbitrage trade uit"""
@@ -419,44 +837,71 @@ class ExchangeManager:
                 'profit_pct': (sell_order['price'] - buy_order['price']) / buy_order['price'] * 100
             }
             
-        except Exception as e:
-            print(f"Fout bij arbitrage uitvoering: {str(e)}")
+        except Exception:
+            logger.exception("Fout bij arbitrage uitvoering")
             return None
     
+    async def _place_grid_async(self, exchange_name: str, symbol: str, side: str,
+                                prices: list, amounts: list):
+        """Plaats alle grid orders (prijs, hoeveelheid) op één exchange gelijktijdig"""
+        exchange = self.exchanges[exchange_name]['instance_async']
+        
+        order_params = {'timeInForce': 'GTC'}
+        if self.exchanges[exchange_name]['type'] == 'futures':
+            order_params['type'] = 'future'
+        
+        # Niet meer requests tegelijk in flight dan de exchange per seconde toestaat
+        semaphore = asyncio.Semaphore(max(1, int(1000 / (exchange.rateLimit or 1000))))
+        
+        bucket = self._buckets[exchange_name]
+        
+        async def place(price, amount):
+            async with semaphore:
+                await bucket.acquire_async()
+                return await exchange.create_order(
+                    symbol, 'limit', side, amount, price, dict(order_params)
+                )
+        
+        results = await asyncio.gather(
+            *(place(price, amount) for price, amount in zip(prices, amounts)),
+            return_exceptions=True
+        )
+        
+        orders = []
+        for price, result in zip(prices, results):
+            if isinstance(result, Exception):
+                logger.warning("Fout bij plaatsen order op %s voor prijs %s: %s", exchange_name, price, result)
+            elif result:
+                orders.append(result)
+        
+        return {
+            'orders': orders,
+            'count': len(orders)
+        }
+    
+    async def sync_orders_across_exchanges_async(self, symbol: str, grid_levels: list,
+                                                 order_size: float, side: str = 'buy'):
+        """Plaats grid orders op alle exchanges tegelijk"""
+        exchange_names = list(self.exchanges)
+        
+        # Hoeveelheden in één vector deling; tolist() geeft ccxt gewone Python floats
+        prices_arr = np.asarray(grid_levels, dtype=np.float64)
+        amounts_arr = order_size / prices_arr
+        prices, amounts = prices_arr.tolist(), amounts_arr.tolist()
+        
+        results = await asyncio.gather(*(
+            self._place_grid_async(name, symbol, side, prices, amounts)
+            for name in exchange_names
+        ))
+        
+        return dict(zip(exchange_names, results))
+    
     def sync_orders_across_exchanges(self, symbol: str, grid_levels: list, 
                                    order_size: float, side: str = 'buy'):
         """Plaats grid orders op meerdere exchanges tegelijk"""
-        results = {}
-        
-        for exchange_name in self.exchanges:
-            orders = []
-            
-            for price in grid_levels:
-                try:
-                    amount = order_size / price
-                    
-                    order = self.create_order(
-                        symbol=symbol,
-                        order_type='limit',
-                        side=side,
-                        amount=amount,
-                        price=price,
-                        exchange_name=exchange_name,
-                        params={'timeInForce': 'GTC'}
-                    )
-                    
-                    if order:
-                        orders.append(order)
-                        
-                except Exception as e:
-                    print(f"Fout bij plaatsen order op {exchange_name} voor prijs {price}: {str(e)}")
-            
-            results[exchange_name] = {
-                'orders': orders,
-                'count': len(orders)
-            }
-        
-        return results
+        return self._run_async(
+            self.sync_orders_across_exchanges_async(symbol, grid_levels, order_size, side)
+        )
     
     def cancel_all_orders(self, symbol: str = None, exchange_name: str = None):
         """Cancel alle orders op een exchange"""
@@ -468,17 +913,35 @@ class ExchangeManager:
         try:
             exchange = self.exchanges[exchange_name]['instance']
             
-            if symbol:
-                exchange.cancel_all_orders(symbol)
-            else:
-                exchange.cancel_all_orders()
+            with self._exchange_call(exchange_name):
+                if symbol:
+                    exchange.cancel_all_orders(symbol)
+                else:
+                    exchange.cancel_all_orders()
             
             return True
             
-        except Exception as e:
-            print(f"Fout bij cancellen orders op {exchange_name}: {str(e)}")
+        except Exception:
+            logger.exception("Fout bij cancellen orders op %s", exchange_name)
             return False
     
+    def get_order_book(self, symbol: str, exchange_name: str = None, limit: int = None):
+        """Haal het orderboek op"""
+        exchange_name = exchange_name or self.active_exchange
+        
+        if exchange_name not in self.exchanges:
+            return None
+        
+        try:
+            exchange = self.exchanges[exchange_name]['instance']
+            return self._cached_call(
+                exchange_name, 'order_book', (symbol, limit),
+                lambda: self._throttled(exchange_name, exchange.fetch_order_book, symbol, limit)
+            )
+        except Exception:
+            logger.exception("Fout bij ophalen orderboek %s van %s", symbol, exchange_name)
+            return None
+    
     def get_fee_structure(self, exchange_name: str):
         """Haal fee structuur op van exchange"""
         fee_structures = {
@@ -519,27 +982,24 @@ class ExchangeManager:
         if not order_book:
             return None
         
-        total_cost = 0
-        remaining = amount
-        
-        if side == 'buy':
-            for price, volume in order_book['asks']:
-                if remaining <= 0:
-                    break
-                fill_amount = min(remaining, volume)
-                total_cost += fill_amount * price
-                remaining -= fill_amount
-        else:
-            for price, volume in order_book['bids']:
-                if remaining <= 0:
-                    break
-                fill_amount = min(remaining, volume)
-                total_cost += fill_amount * price
-                remaining -= fill_amount
-        
-        if remaining > 0:
+        levels = order_book['asks'] if side == 'buy' else order_book['bids']
+        if not levels:
+            return None
+        
+        # ccxt levert [price, volume] paren (soms met extra kolommen)
+        book = np.asarray(levels, dtype=np.float64)
+        prices, volumes = book[:, 0], book[:, 1]
+        cum_volume = np.cumsum(volumes)
+        
+        if cum_volume[-1] < amount:
             return None  # Niet genoeg volume
         
+        # Volle levels tot idx, daarna een gedeeltelijke fill op level idx
+        idx = int(np.searchsorted(cum_volume, amount))
+        total_cost = float(prices[:idx] @ volumes[:idx])
+        filled = cum_volume[idx - 1] if idx > 0 else 0.0
+        total_cost += (amount - filled) * prices[idx]
+        
         avg_price = total_cost / amount
         market_price = ticker['last']
         slippage = (avg_price - market_price) / market_price * 100
@@ -553,7 +1013,8 @@ class ExchangeManager:
 
 # Voorbeeld gebruik
 if __name__ == "__main__":
-    manager = ExchangeManager()
+    logging.basicConfig(level=logging.INFO)
+    manager = ExchangeManager(use_cache='--no-cache' not in sys.argv)
     
     # Voeg exchanges toe
     manager.add_exchange('binance', {
@@ -568,7 +1029,7 @@ if __name__ == "__main__":
     
     # Haal balansen op
     balances = manager.fetch_all_balances()
-    print("Balances:", json.dumps(balances, indent=2))
+    print("Balances:", orjson.dumps(balances, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY).decode())
     
     # Vergelijk prijzen
     prices = manager.compare_prices('BTC/USDT')
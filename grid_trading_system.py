@@ -1,55 +1,292 @@
-import ccxt
 import pandas as pd
 import numpy as np
-import warnings
 from datetime import datetime
 import json
 import pickle
-from decimal import Decimal, ROUND_DOWN
+from pathlib import Path
 import time
+from _njit import njit, NUMBA_AVAILABLE
 
-warnings.filterwarnings('ignore')
+def _grid_hit_bounds(prices, grid, tolerance=0.001):
+    """Per tick het stuk [lo, hi) van het gesorteerde grid binnen tolerance van de prijs
+    
+    |p - c| / c < tolerance  <=>  p / (1 + tolerance) < c < p / (1 - tolerance), dus per tick
+    is het een aaneengesloten stuk van het gesorteerde grid: twee binary searches i.p.v. alle levels.
+    Geeft (lo, hi, order) terug; order[s] is de index in grid van gesorteerde positie s.
+    """
+    order = np.argsort(grid, kind='stable')
+    sorted_grid = grid[order]
+    lo = np.searchsorted(sorted_grid, prices / (1 + tolerance), side='right')
+    hi = np.searchsorted(sorted_grid, prices / (1 - tolerance), side='left')
+    return lo, hi, order
+
+@njit(cache=True)
+def _run_sim_kernel(prices, grid, amounts, lo, hi, order, cash, positions, fee_rate):
+    """Volledige simulatie tick loop; side 0 = buy, 1 = sell
+    
+    Zelfde regels als place_order/execute_trade: een buy wordt alleen gevuld met genoeg
+    cash, een sell alleen geplaatst met een open positie en gevuld als die groot genoeg is.
+    Geeft (equity, trade_tick, trade_level, trade_side, cash, positions) terug.
+    """
+    n = prices.shape[0]
+    equity = np.empty(n, dtype=np.float64)
+    
+    # Elke hit is hooguit één trade
+    capacity = 0
+    for i in range(n):
+        capacity += hi[i] - lo[i]
+    trade_tick = np.empty(capacity, dtype=np.int64)
+    trade_level = np.empty(capacity, dtype=np.int64)
+    trade_side = np.empty(capacity, dtype=np.int8)
+    n_trades = 0
+    
+    for i in range(n):
+        price = prices[i]
+        for s in range(lo[i], hi[i]):
+            j = order[s]
+            notional = grid[j] * amounts[j]
+            fee = notional * fee_rate
+            side = 0
+            if price <= grid[j]:
+                if cash >= notional + fee:
+                    cash -= notional + fee
+                    positions += amounts[j]
+            elif positions > 0:
+                side = 1
+                if positions >= amounts[j]:
+                    cash += notional - fee
+                    positions -= amounts[j]
+            else:
+                continue
+            
+            trade_tick[n_trades] = i
+            trade_level[n_trades] = j
+            trade_side[n_trades] = side
+            n_trades += 1
+        
+        equity[i] = cash + positions * price
+    
+    return equity, trade_tick[:n_trades], trade_level[:n_trades], trade_side[:n_trades], cash, positions
+
+@njit(cache=True)
+def _mean_revert(prices, base_price):
+    """Trek prijzen buiten ±10% van base_price terug (in place)"""
+    for i in range(1, prices.shape[0]):
+        if prices[i] > base_price * 1.1:
+            prices[i] = prices[i-1] * 0.999
+        elif prices[i] < base_price * 0.9:
+            prices[i] = prices[i-1] * 1.001
+
+if NUMBA_AVAILABLE:
+    # Compileer (of laad uit de cache) bij import met dummy data van dezelfde dtypes,
+    # zodat setup_simulation niet op de JIT wacht
+    _mean_revert(np.full(2, 1.0, dtype=np.float64), 1.0)
+
+@njit(cache=True)
+def _metrics(values, profits, risk_free_rate):
+    """Sharpe, max drawdown (%), win rate (%) en profit factor in één pass per array"""
+    # Drawdown en returns (Welford voor de sample std) in dezelfde loop over de equity
+    peak = values[0]
+    max_dd = 0.0
+    n_ret = 0
+    mean_r = 0.0
+    m2 = 0.0
+    for i in range(values.shape[0]):
+        v = values[i]
+        if v > peak:
+            peak = v
+        dd = (v - peak) / peak
+        if dd < max_dd:
+            max_dd = dd
+        if i > 0:
+            r = (v - values[i-1]) / values[i-1]
+            n_ret += 1
+            delta = r - mean_r
+            mean_r += delta / n_ret
+            m2 += delta * (r - mean_r)
+    
+    sharpe = 0.0
+    if n_ret >= 2:
+        std = np.sqrt(m2 / (n_ret - 1))
+        if std != 0:
+            sharpe = np.sqrt(252.0) * (mean_r - risk_free_rate / 252) / std
+    
+    gross_profit = 0.0
+    gross_loss = 0.0
+    wins = 0
+    for p in profits:
+        if p > 0:
+            gross_profit += p
+            wins += 1
+        elif p < 0:
+            gross_loss -= p
+    
+    n_trades = profits.shape[0]
+    win_rate = 0.0
+    profit_factor = 0.0
+    if n_trades:
+        win_rate = wins / n_trades * 100
+        profit_factor = gross_profit / gross_loss if gross_loss != 0 else np.inf
+    
+    return sharpe, max_dd * 100, win_rate, profit_factor
+
+# Standaard backtest periode als run_backtest geen start_date krijgt
+_DEFAULT_BACKTEST_WINDOW = pd.Timedelta(days=30)
+
+# Begincapaciteit van de trade buffers; verdubbelt als hij vol is
+TRADE_CAPACITY = 1024
+TRADE_SIDES = ('buy', 'sell')
+
+class TradeLog:
+    """Trades als parallelle NumPy kolommen in plaats van een lijst dicts"""
+    
+    COLUMNS = {
+        'order_id': np.int64,
+        'tick': np.int64,  # sim_time index in simulatie, -1 voor live trades
+        'timestamp': 'datetime64[ns]',
+        'price': np.float64,
+        'amount': np.float64,
+        'side': np.int8,  # index in TRADE_SIDES
+        'fee': np.float64,
+        'profit': np.float64
+    }
+    
+    def __init__(self, capacity=TRADE_CAPACITY):
+        self.n = 0
+        self.arrays = {name: np.empty(capacity, dtype=dtype) for name, dtype in self.COLUMNS.items()}
+    
+    def __len__(self):
+        return self.n
+    
+    def append(self, order_id, timestamp, price, amount, side, fee, profit=0.0, tick=-1):
+        """Voeg een trade toe; geeft de index terug (timestamp None = NaT, later via resolve_timestamps)"""
+        self._reserve(self.n + 1)
+        
+        i = self.n
+        self.arrays['order_id'][i] = order_id
+        self.arrays['tick'][i] = tick
+        self.arrays['timestamp'][i] = np.datetime64(timestamp, 'ns')
+        self.arrays['price'][i] = price
+        self.arrays['amount'][i] = amount
+        self.arrays['side'][i] = TRADE_SIDES.index(side)
+        self.arrays['fee'][i] = fee
+        self.arrays['profit'][i] = profit
+        self.n += 1
+        return i
+    
+    def extend(self, columns):
+        """Voeg een blok trades in één keer toe; columns heeft een array per kolom in COLUMNS"""
+        end = self.n + len(columns['price'])
+        self._reserve(end)
+        for name, dtype in self.COLUMNS.items():
+            self.arrays[name][self.n:end] = np.asarray(columns[name], dtype=dtype)
+        self.n = end
+    
+    def _reserve(self, size):
+        """Zorg voor minstens size rijen; verdubbelt de capaciteit waar nodig"""
+        capacity = len(self.arrays['price'])
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        for name, arr in self.arrays.items():
+            grown = np.empty(capacity, dtype=arr.dtype)
+            grown[:self.n] = arr[:self.n]
+            self.arrays[name] = grown
+    
+    def resolve_timestamps(self, timestamps):
+        """Vul de timestamps van simulatie trades in één lookup op hun tick"""
+        ticks = self.column('tick')
+        sim = ticks >= 0
+        self.arrays['timestamp'][:self.n][sim] = np.asarray(timestamps, dtype='datetime64[ns]')[ticks[sim]]
+    
+    def column(self, name):
+        """View op de gevulde rijen van een kolom"""
+        return self.arrays[name][:self.n]
+    
+    def records(self, start=0):
+        """Trades vanaf start als lijst dicts, voor rapportage en opslag"""
+        start = max(0, start if start >= 0 else self.n + start)
+        columns = {name: self.arrays[name][start:self.n] for name in self.COLUMNS}
+        columns['timestamp'] = columns['timestamp'].astype('datetime64[us]')
+        columns = {name: arr.tolist() for name, arr in columns.items()}
+        columns['side'] = [TRADE_SIDES[s] for s in columns['side']]
+        return [dict(zip(columns, row)) for row in zip(*columns.values())]
+    
+    def tail(self, k):
+        """Laatste k trades als dicts"""
+        return self.records(-k)
+    
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Bouw een TradeLog op uit kolommen (bv. uit een .npz bestand)"""
+        n = len(arrays['price'])
+        log = cls(max(TRADE_CAPACITY, n))
+        for name, dtype in cls.COLUMNS.items():
+            log.arrays[name][:n] = np.asarray(arrays[name], dtype=dtype)
+        log.n = n
+        return log
+    
+    @classmethod
+    def from_records(cls, trades):
+        """Bouw een TradeLog op uit een lijst trade dicts"""
+        log = cls(max(TRADE_CAPACITY, len(trades)))
+        for t in trades:
+            log.append(t['order_id'], t['timestamp'], t['price'], t['amount'],
+                       t['side'], t['fee'], t.get('profit', 0.0), t.get('tick', -1))
+        return log
 
 class GridTradingSystem:
     """Hoofdsysteem voor Grid Trading met backtesting, simulatie en dashboard"""
     
-    def __init__(self, mode='simulation', exchange='binance', symbol='BTC/USDT'):
+    def __init__(self, mode='simulation', exchange='binance', symbol='BTC/USDT', duration_hours=24,
+                 sim_end=None):
         self.mode = mode  # 'live', 'simulation', 'backtest'
         self.symbol = symbol
         self.exchange_name = exchange
+        self._duration_ticks = duration_hours * 60  # simulatie lengte in minuut-ticks
         self.grid_levels = []
         self.orders = []
-        self.trades = []
+        # Aantal orders van eerdere runs die niet in self.orders staan (zie from_run_state)
+        self._order_base = 0
+        self.trades = TradeLog()
         self.portfolio = {
             'cash': 10000,
             'positions': 0,
             'total_value': 10000
         }
         self.performance_metrics = {}
+        self.backtester = None
         
         if mode == 'live':
             self.setup_live_exchange()
         elif mode == 'simulation':
-            self.setup_simulation()
+            self.setup_simulation(sim_end)
         elif mode == 'backtest':
             self.setup_backtest()
     
     def setup_live_exchange(self, api_key=None, api_secret=None):
         """Setup voor live trading"""
         if api_key and api_secret:
-            self.exchange = ccxt.binance({
+            # Pas hier laden: ccxt is zwaar en alleen nodig voor live trading
+            import ccxt
+            
+            config = {
                 'apiKey': api_key,
                 'secret': api_secret,
                 'options': {'defaultType': 'future'},
                 'enableRateLimit': True
-            })
+            }
+            self.exchange = ccxt.binance(config)
         else:
             print("Running in demo mode - no real orders")
             self.exchange = None
     
-    def setup_simulation(self):
+    def setup_simulation(self, end=None):
         """Setup voor simulatie met mock data"""
-        self.sim_data = self.generate_market_data()
+        # Vaste seed en eindtijd: sim_data is hiermee altijd opnieuw op te bouwen (zie run_state)
+        self._sim_end = end or datetime.now()
+        self.sim_data = self.generate_market_data(end=self._sim_end)
         self.current_sim_price = self.sim_data['close'].iloc[0]
         self.sim_time = 0
     
@@ -58,10 +295,10 @@ class GridTradingSystem:
         self.historical_data = None
         self.backtest_results = {}
     
-    def generate_market_data(self, days=30, volatility=0.02):
+    def generate_market_data(self, days=30, volatility=0.02, end=None):
         """Genereer simulatie data"""
         np.random.seed(42)
-        dates = pd.date_range(end=datetime.now(), periods=days*24*60, freq='1min')
+        dates = pd.date_range(end=end or datetime.now(), periods=days*24*60, freq='1min')
         base_price = 50000
         
         # Random walk met trend
@@ -69,11 +306,8 @@ class GridTradingSystem:
         prices = base_price * np.exp(np.cumsum(returns))
         
         # Voeg wat mean reversion toe
-        for i in range(1, len(prices)):
-            if prices[i] > base_price * 1.1:
-                prices[i] = prices[i-1] * 0.999
-            elif prices[i] < base_price * 0.9:
-                prices[i] = prices[i-1] * 1.001
+        prices = np.ascontiguousarray(prices, dtype=np.float64)
+        _mean_revert(prices, float(base_price))
         
         df = pd.DataFrame({
             'timestamp': dates,
@@ -93,25 +327,24 @@ class GridTradingSystem:
         elif grid_type == 'geometric':
             self.grid_levels = np.geomspace(lower_bound, upper_bound, num_grids)
         elif grid_type == 'fibonacci':
-            fib_ratios = self.generate_fibonacci_ratios(num_grids)
-            price_range = upper_bound - lower_bound
-            self.grid_levels = [lower_bound + ratio * price_range for ratio in fib_ratios]
+            self.grid_levels = lower_bound + self.generate_fibonacci_ratios(num_grids) * (upper_bound - lower_bound)
         
         return self.grid_levels
     
     def generate_fibonacci_ratios(self, n):
         """Genereer Fibonacci ratios voor grid spacing"""
-        fib = [0, 1]
+        fib = np.empty(max(n, 2), dtype=np.float64)
+        fib[0] = 0
+        fib[1] = 1
         for i in range(2, n):
-            fib.append(fib[-1] + fib[-2])
+            fib[i] = fib[i-1] + fib[i-2]
         
-        max_fib = max(fib)
-        return [f/max_fib for f in fib]
+        return fib / fib[-1]
     
     def place_order(self, price, amount, side, order_type='limit'):
         """Plaats een order (live of simulatie)"""
         order = {
-            'id': len(self.orders) + 1,
+            'id': self._order_base + len(self.orders) + 1,
             'timestamp': datetime.now(),
             'price': price,
             'amount': amount,
@@ -121,18 +354,23 @@ class GridTradingSystem:
         }
         
         if self.mode == 'simulation':
-            # Simuleer order matching
+            # Simuleer order matching; tijd van de huidige tick i.p.v. de wall clock
+            order['tick'] = self.sim_time
+            order['timestamp'] = self.sim_data['timestamp'].iat[self.sim_time]
             order['status'] = 'filled'
             self.execute_trade(order)
         elif self.mode == 'live' and self.exchange:
             try:
                 if order_type == 'limit':
+                    # Pas aan de exchange grens afronden; ccxt kent de precisionMode van de
+                    # exchange (tick size of aantal decimalen), de simulatie blijft pure float
+                    self.exchange.load_markets()
                     exchange_order = self.exchange.create_order(
                         symbol=self.symbol,
                         type='LIMIT',
                         side=side,
-                        amount=amount,
-                        price=price,
+                        amount=float(self.exchange.amount_to_precision(self.symbol, amount)),
+                        price=float(self.exchange.price_to_precision(self.symbol, price)),
                         params={'timeInForce': 'GTC'}
                     )
                     order['exchange_id'] = exchange_order['id']
@@ -144,30 +382,31 @@ class GridTradingSystem:
         return order
     
     def execute_trade(self, order):
-        """Voer een trade uit en update portfolio"""
-        trade = {
-            'order_id': order['id'],
-            'timestamp': datetime.now(),
-            'price': order['price'],
-            'amount': order['amount'],
-            'side': order['side'],
-            'fee': order['price'] * order['amount'] * 0.001
-        }
+        """Voer een trade uit en update portfolio; geeft de index in self.trades terug"""
+        fee = order['price'] * order['amount'] * 0.001
         
         if order['side'] == 'buy':
-            cost = order['price'] * order['amount'] + trade['fee']
+            cost = order['price'] * order['amount'] + fee
             if self.portfolio['cash'] >= cost:
                 self.portfolio['cash'] -= cost
                 self.portfolio['positions'] += order['amount']
         else:  # sell
             if self.portfolio['positions'] >= order['amount']:
-                revenue = order['price'] * order['amount'] - trade['fee']
+                revenue = order['price'] * order['amount'] - fee
                 self.portfolio['cash'] += revenue
                 self.portfolio['positions'] -= order['amount']
         
-        self.trades.append(trade)
+        if self.mode == 'simulation':
+            # Tick index i.p.v. wall clock; run_simulation zet de echte tijden in één keer
+            trade_idx = self.trades.append(
+                order['id'], None, order['price'], order['amount'], order['side'], fee, tick=self.sim_time
+            )
+        else:
+            trade_idx = self.trades.append(
+                order['id'], datetime.now(), order['price'], order['amount'], order['side'], fee
+            )
         self.update_portfolio_value(order['price'])
-        return trade
+        return trade_idx
     
     def update_portfolio_value(self, current_price):
         """Update totale portefeuille waarde"""
@@ -176,72 +415,176 @@ class GridTradingSystem:
             self.portfolio['positions'] * current_price
         )
     
-    def run_strategy(self, strategy_params):
-        """Voer grid trading strategie uit"""
+    def run_state(self):
+        """Wat een run in een ander process nodig heeft: instellingen, de eindtijd van de
+        (geseede) marktdata en de lopende portfolio en trades; geen sim_data, orders of resultaten"""
+        return {
+            'mode': self.mode,
+            'exchange': self.exchange_name,
+            'symbol': self.symbol,
+            'duration_ticks': self._duration_ticks,
+            'sim_end': getattr(self, '_sim_end', None),
+            'order_base': self._order_base + len(self.orders),
+            'portfolio': dict(self.portfolio),
+            'trades': {name: self.trades.column(name) for name in TradeLog.COLUMNS}
+        }
+    
+    @classmethod
+    def from_run_state(cls, state):
+        """Bouw een systeem op uit run_state(); sim_data wordt opnieuw gegenereerd"""
+        system = cls(state['mode'], state['exchange'], state['symbol'], sim_end=state['sim_end'])
+        system._duration_ticks = state['duration_ticks']
+        system._order_base = state['order_base']
+        system.portfolio = state['portfolio']
+        system.trades = TradeLog.from_arrays(state['trades'])
+        return system
+    
+    def export_run(self, results, orders_from=0):
+        """State die een run_strategy veranderd heeft, klein genoeg voor de terugweg uit een
+        worker process: nieuwe orders vanaf orders_from, de TradeLog als kolommen, geen marktdata"""
+        results = dict(results or {})
         if self.mode == 'simulation':
-            return self.run_simulation(strategy_params)
+            # Zelfde records als de TradeLog; merge_run bouwt ze aan de andere kant weer op
+            results.pop('trades', None)
+        
+        return {
+            'results': results,
+            'grid_levels': self.grid_levels,
+            'orders': self.orders[orders_from:],
+            'trades': {name: self.trades.column(name) for name in TradeLog.COLUMNS},
+            'portfolio': self.portfolio,
+            'metrics': self.performance_metrics,
+            'sim_time': getattr(self, 'sim_time', None),
+            'current_sim_price': getattr(self, 'current_sim_price', None)
+        }
+    
+    def merge_run(self, run, orders_from=0):
+        """Neem de uitkomst van export_run over; geeft de results van de run terug"""
+        self.grid_levels = run['grid_levels']
+        del self.orders[orders_from:]
+        self.orders.extend(run['orders'])
+        self.trades = TradeLog.from_arrays(run['trades'])
+        self.portfolio = run['portfolio']
+        self.performance_metrics = run['metrics']
+        if run['sim_time'] is not None:
+            self.sim_time = run['sim_time']
+            self.current_sim_price = run['current_sim_price']
+        
+        results = run['results']
+        if self.mode == 'simulation':
+            results['trades'] = self.trades.records()
+            self.simulation_results = results
+        elif self.mode == 'backtest':
+            self.backtest_results = results
+        return results
+    
+    def run_strategy(self, strategy_params, stop_event=None):
+        """Voer grid trading strategie uit
+        
+        Met een gezette stop_event (threading.Event) start de run niet, en een simulatie
+        die al loopt legt zijn resultaten niet meer vast.
+        """
+        if stop_event is not None and stop_event.is_set():
+            return {'status': 'stopped'}
+        if self.mode == 'simulation':
+            return self.run_simulation(strategy_params, stop_event=stop_event)
         elif self.mode == 'backtest':
             return self.run_backtest(strategy_params)
         elif self.mode == 'live':
             return self.run_live(strategy_params)
     
-    def run_simulation(self, params, duration_hours=24):
-        """Run simulatie"""
+    def run_simulation(self, params, duration_hours=None, stop_event=None):
+        """Run simulatie; zonder duration_hours geldt de duur uit __init__"""
         results = {
-            'equity_curve': [],
+            'equity_curve': {},
             'trades': [],
             'metrics': {}
         }
         
         # Setup grid
-        current_price = self.sim_data['close'].iloc[0]
+        close_arr = self.sim_data['close'].to_numpy()
+        ts_arr = self.sim_data['timestamp'].to_numpy()
+        
+        current_price = close_arr[0]
         lower = current_price * (1 - params['grid_range_pct'])
         upper = current_price * (1 + params['grid_range_pct'])
         
         self.calculate_grid(current_price, lower, upper, 
                           params['num_grids'], params['grid_type'])
         
-        # Run simulatie
-        for i in range(min(len(self.sim_data), duration_hours * 60)):
-            self.current_sim_price = self.sim_data['close'].iloc[i]
-            self.sim_time = i
-            
-            # Check for grid hits
-            for grid_price in self.grid_levels:
-                price_diff = abs(self.current_sim_price - grid_price) / grid_price
-                
-                if price_diff < 0.001:  # 0.1% tolerance
-                    # Place order at this grid level
-                    amount = params['order_size'] / grid_price
-                    
-                    if self.current_sim_price <= grid_price:
-                        self.place_order(grid_price, amount, 'buy')
-                    else:
-                        if self.portfolio['positions'] > 0:
-                            self.place_order(grid_price, amount, 'sell')
-            
-            # Update equity curve
+        duration_ticks = self._duration_ticks if duration_hours is None else duration_hours * 60
+        n_ticks = min(len(self.sim_data), duration_ticks)
+        prices = close_arr[:n_ticks]
+        grid = np.asarray(self.grid_levels, dtype=np.float64)
+        # Order grootte per level ligt vast; één deling per level in plaats van per hit
+        amounts = params['order_size'] / grid
+        
+        # Alle grid hits (0.1% tolerance) in één keer, daarna de hele tick loop gecompileerd
+        lo, hi, order = _grid_hit_bounds(prices, grid)
+        eq_val, trade_tick, trade_level, trade_side, cash, positions = _run_sim_kernel(
+            prices, grid, amounts, lo, hi, order,
+            float(self.portfolio['cash']), float(self.portfolio['positions']), 0.001
+        )
+        if stop_event is not None and stop_event.is_set():
+            return {'status': 'stopped'}
+        
+        # Resultaten van de kernel terug in orders, trades en portfolio
+        trade_price = grid[trade_level]
+        trade_amount = amounts[trade_level]
+        first_id = self._order_base + len(self.orders) + 1
+        order_ids = np.arange(first_id, first_id + len(trade_tick))
+        # Order tijden in één lookup op de tick
+        order_times = ts_arr[trade_tick].astype('datetime64[us]').tolist()
+        self.orders.extend(
+            {'id': order_id, 'tick': tick, 'timestamp': ts, 'price': price, 'amount': amount,
+             'side': TRADE_SIDES[side], 'type': 'limit', 'status': 'filled'}
+            for order_id, tick, ts, price, amount, side in zip(
+                order_ids.tolist(), trade_tick.tolist(), order_times, trade_price.tolist(),
+                trade_amount.tolist(), trade_side.tolist()
+            )
+        )
+        self.trades.extend({
+            'order_id': order_ids,
+            'tick': trade_tick,
+            'timestamp': np.full(len(trade_tick), np.datetime64('NaT', 'ns')),
+            'price': trade_price,
+            'amount': trade_amount,
+            'side': trade_side,
+            'fee': trade_price * trade_amount * 0.001,
+            'profit': np.zeros(len(trade_tick))
+        })
+        
+        self.portfolio['cash'] = cash
+        self.portfolio['positions'] = positions
+        if n_ticks:
+            self.current_sim_price = prices[-1]
+            self.sim_time = n_ticks - 1
             self.update_portfolio_value(self.current_sim_price)
-            results['equity_curve'].append({
-                'timestamp': self.sim_data['timestamp'].iloc[i],
-                'value': self.portfolio['total_value'],
-                'price': self.current_sim_price
-            })
+        
+        results['equity_curve'] = {
+            'timestamp': ts_arr[:n_ticks],
+            'value': eq_val,
+            'price': prices
+        }
         
         # Calculate metrics
         results['metrics'] = self.calculate_performance_metrics(results['equity_curve'])
-        results['trades'] = self.trades.copy()
+        self.trades.resolve_timestamps(ts_arr)
+        results['trades'] = self.trades.records()
         
         self.simulation_results = results
         return results
     
     def run_backtest(self, params, start_date=None, end_date=None):
         """Backtest strategie op historische data"""
-        from backtester import Backtester
-        backtester = Backtester()
+        # Eén Backtester per systeem; de koersdata zelf cachet fetch_historical_data op schijf
+        if self.backtester is None:
+            from backtester import Backtester
+            self.backtester = Backtester()
+        backtester = self.backtester
         
         if start_date is None:
-            start_date = (datetime.now() - pd.Timedelta(days=30)).strftime('%Y-%m-%d')
+            start_date = (datetime.now() - _DEFAULT_BACKTEST_WINDOW).strftime('%Y-%m-%d')
         if end_date is None:
             end_date = datetime.now().strftime('%Y-%m-%d')
         
@@ -263,22 +606,21 @@ class GridTradingSystem:
         return {"status": "live_trading_started"}
     
     def calculate_performance_metrics(self, equity_curve):
-        """Bereken prestatiemetrics"""
-        if not equity_curve:
+        """Bereken prestatiemetrics uit een kolomsgewijze equity curve (timestamp/value/price)"""
+        values = np.asarray(equity_curve.get('value', ()), dtype=np.float64)
+        if not len(values):
             return {}
         
-        df = pd.DataFrame(equity_curve)
-        returns = df['value'].pct_change().dropna()
+        sharpe, max_dd, win_rate, profit_factor = _metrics(values, self.trades.column('profit'), 0.02)
         
         metrics = {
-            'total_return': (df['value'].iloc[-1] / df['value'].iloc[0] - 1) * 100,
-            'sharpe_ratio': self.calculate_sharpe_ratio(returns),
-            'max_drawdown': self.calculate_max_drawdown(df['value']),
-            'win_rate': self.calculate_win_rate(),
-            'profit_factor': self.calculate_profit_factor(),
+            'total_return': (values[-1] / values[0] - 1) * 100,
+            'sharpe_ratio': sharpe,
+            'max_drawdown': max_dd,
+            'win_rate': win_rate,
+            'profit_factor': profit_factor,
             'total_trades': len(self.trades),
-            'avg_trade': np.mean([t.get('profit', 0) for t in self.trades if 'profit' in t]) 
-                         if self.trades else 0
+            'avg_trade': float(self.trades.column('profit').mean()) if len(self.trades) else 0
         }
         
         self.performance_metrics = metrics
@@ -286,32 +628,34 @@ class GridTradingSystem:
     
     def calculate_sharpe_ratio(self, returns, risk_free_rate=0.02):
         """Bereken Sharpe ratio"""
+        returns = np.asarray(returns, dtype=np.float64)
         if len(returns) < 2:
             return 0
+        std = returns.std(ddof=1)
         excess_returns = returns - risk_free_rate/252
-        return np.sqrt(252) * excess_returns.mean() / returns.std() if returns.std() != 0 else 0
+        return np.sqrt(252) * excess_returns.mean() / std if std != 0 else 0
     
     def calculate_max_drawdown(self, values):
         """Bereken maximale drawdown"""
-        peak = values.expanding(min_periods=1).max()
-        drawdown = (values - peak) / peak
-        return drawdown.min() * 100
+        arr = np.asarray(values, dtype=np.float64)
+        peak = np.maximum.accumulate(arr)
+        return float(((arr - peak) / peak).min()) * 100
     
     def calculate_win_rate(self):
         """Bereken win percentage"""
-        if not self.trades:
+        if not len(self.trades):
             return 0
         
-        profitable_trades = sum(1 for t in self.trades if t.get('profit', 0) > 0)
-        return (profitable_trades / len(self.trades)) * 100 if self.trades else 0
+        return float((self.trades.column('profit') > 0).mean()) * 100
     
     def calculate_profit_factor(self):
         """Bereken profit factor"""
-        if not self.trades:
+        if not len(self.trades):
             return 0
         
-        gross_profit = sum(t.get('profit', 0) for t in self.trades if t.get('profit', 0) > 0)
-        gross_loss = abs(sum(t.get('profit', 0) for t in self.trades if t.get('profit', 0) < 0))
+        profits = self.trades.column('profit')
+        gross_profit = profits[profits > 0].sum()
+        gross_loss = abs(profits[profits < 0].sum())
         
         return gross_profit / gross_loss if gross_loss != 0 else float('inf')
     
@@ -323,47 +667,73 @@ class GridTradingSystem:
                 'portfolio': self.portfolio.copy(),
                 'grid_levels': self.grid_levels,
                 'orders': self.orders[-10:],
-                'trades': self.trades[-10:],
+                'trades': self.trades.tail(10),
                 'metrics': self.performance_metrics
             }
         elif self.mode == 'live':
             try:
-                ticker = self.exchange.fetch_ticker(self.symbol)
-                return {
-                    'price': ticker['last'],
-                    'portfolio': self.portfolio,
-                    'grid_levels': self.grid_levels,
-                    'orders': self.orders[-10:],
-                    'trades': self.trades[-10:],
-                    'metrics': self.performance_metrics
-                }
-            except:
-                return {
-                    'price': 50000,
-                    'portfolio': self.portfolio,
-                    'grid_levels': self.grid_levels,
-                    'orders': self.orders[-10:],
-                    'trades': self.trades[-10:],
-                    'metrics': self.performance_metrics
-                }
+                price = self.exchange.fetch_ticker(self.symbol)['last']
+            except Exception:
+                price = 50000
+            return {
+                'price': price,
+                'portfolio': self.portfolio,
+                'grid_levels': self.grid_levels,
+                'orders': self.orders[-10:],
+                'trades': self.trades.tail(10),
+                'metrics': self.performance_metrics
+            }
         return {}
     
+    @staticmethod
+    def _results_path(filename):
+        """.pkl blijft pickle; elke andere naam krijgt .npz, net als np.savez_compressed doet"""
+        path = Path(filename)
+        if path.suffix in ('.pkl', '.npz'):
+            return path
+        return path.with_name(path.name + '.npz')
+    
     def save_results(self, filename):
-        """Sla resultaten op"""
-        with open(filename, 'wb') as f:
-            pickle.dump({
-                'trades': self.trades,
-                'portfolio': self.portfolio,
-                'metrics': self.performance_metrics
-            }, f)
+        """Sla resultaten op als gecomprimeerde .npz (trade kolommen); .pkl blijft pickle"""
+        filename = self._results_path(filename)
+        if filename.suffix == '.pkl':
+            with open(filename, 'wb') as f:
+                pickle.dump({
+                    'trades': self.trades.records(),
+                    'portfolio': self.portfolio,
+                    'metrics': self.performance_metrics
+                }, f)
+            return
+        
+        trade_columns = {f'trade_{name}': self.trades.column(name) for name in TradeLog.COLUMNS}
+        np.savez_compressed(
+            filename,
+            **trade_columns,
+            portfolio_cash=self.portfolio['cash'],
+            portfolio_positions=self.portfolio['positions'],
+            portfolio_total_value=self.portfolio['total_value'],
+            metrics=json.dumps(self.performance_metrics, default=float)
+        )
     
     def load_results(self, filename):
-        """Laad opgeslagen resultaten"""
-        with open(filename, 'rb') as f:
-            data = pickle.load(f)
-            self.trades = data['trades']
-            self.portfolio = data['portfolio']
-            self.performance_metrics = data['metrics']
+        """Laad opgeslagen resultaten (.npz, of een oud .pkl bestand)"""
+        filename = self._results_path(filename)
+        if filename.suffix == '.pkl':
+            with open(filename, 'rb') as f:
+                data = pickle.load(f)
+                self.trades = TradeLog.from_records(data['trades'])
+                self.portfolio = data['portfolio']
+                self.performance_metrics = data['metrics']
+            return
+        
+        with np.load(filename) as data:
+            self.trades = TradeLog.from_arrays({name: data[f'trade_{name}'] for name in TradeLog.COLUMNS})
+            self.portfolio = {
+                'cash': float(data['portfolio_cash']),
+                'positions': float(data['portfolio_positions']),
+                'total_value': float(data['portfolio_total_value'])
+            }
+            self.performance_metrics = json.loads(str(data['metrics']))
 
 if __name__ == "__main__":
     # Voorbeeld gebruik
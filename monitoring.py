@@ -1,12 +1,21 @@
+import asyncio
 import psutil
 import time
 from datetime import datetime
 
 class SystemMonitor:
+    def __init__(self):
+        # Eerste meting zet de referentie; volgende calls met interval=None blokkeren niet
+        psutil.cpu_percent(interval=None)
+    
     def collect_metrics(self):
         return {
             'timestamp': datetime.now(),
-            'cpu_percent': psutil.cpu_percent(interval=1),
+            'cpu_percent': psutil.cpu_percent(interval=None),
             'memory_percent': psutil.virtual_memory().percent,
             'disk_percent': psutil.disk_usage('/').percent
-        }
\ No newline at end of file
+        }
+    
+    async def collect_metrics_async(self):
+        """collect_metrics in een worker thread, zodat de event loop niet wacht op psutil"""
+        return await asyncio.to_thread(self.collect_metrics)
\ No newline at end of file
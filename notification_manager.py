@@ -1,12 +1,20 @@
 import smtplib
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import gzip
 import json
+import orjson
+import string
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-import schedule
 import threading
+from collections import defaultdict, deque
+import heapq
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, wait
 from typing import Dict, List, Optional, Union
 import logging
 from dataclasses import dataclass
@@ -15,6 +23,139 @@ from enum import Enum
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Maximale wachttijd (seconden) op alle kanalen samen per notificatie
+SEND_TIMEOUT = 15
+
+# Notificaties onder prioriteit 3 worden per kanaal verzameld en elke BATCH_INTERVAL
+# seconden als één bericht verstuurd; hogere prioriteit gaat direct
+BATCH_INTERVAL = 0.5
+TELEGRAM_MAX_LENGTH = 4096
+TELEGRAM_SEPARATOR = "\n\n---\n\n"
+DISCORD_MAX_EMBEDS = 10
+# Maximaal aantal wachtende notificaties per kanaal; daarboven vallen de oudste af
+MAX_PENDING = 100
+
+# Identieke notificaties (type, titel, bericht) onder prioriteit 3 binnen dit venster
+# (seconden) worden niet opnieuw verstuurd
+DEDUP_WINDOW = 30
+
+_JSON_HEADERS = {'Content-Type': 'application/json'}
+_GZIP_JSON_HEADERS = {'Content-Type': 'application/json', 'Content-Encoding': 'gzip'}
+
+# Kleinere bodies worden niet gecomprimeerd; daar weegt gzip niet op tegen de overhead
+GZIP_MIN_SIZE = 1024
+
+def _dumps(obj) -> bytes:
+    """JSON body voor een webhook/API request"""
+    return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+
+def _format_data(data) -> str:
+    """notification.data leesbaar (indent 2) voor in een bericht"""
+    return orjson.dumps(
+        data, default=str,
+        option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    ).decode()
+
+def _make_http_session():
+    """Gedeelde requests sessie: keep-alive verbindingen naar de webhook/API hosts"""
+    session = requests.Session()
+    # POST expliciet toegestaan: bij 429/502/503 is het bericht niet afgeleverd.
+    # Retry volgt de Retry-After header (Telegram stuurt die bij 429).
+    retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 502, 503],
+                  allowed_methods=frozenset({'GET', 'POST'}), raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=10, pool_maxsize=50, max_retries=retry)
+    session.mount('https://', adapter)
+    return session
+
+# Email opmaak: één keer geparsed, per bericht alleen de variabele velden invullen
+_PRIORITY_COLORS = {
+    1: "#3498db",  # Blue
+    2: "#f39c12",  # Orange
+    3: "#e74c3c",  # Red
+    4: "#8e44ad"   # Purple
+}
+
+_EMAIL_HTML = string.Template("""
+            <!DOCTYPE html>
+            <html>
+            <head>
+                <style>
+                    body { font-family: Arial, sans-serif; }
+                    .container { max-width: 600px; margin: 0 auto; padding: 20px; }
+                    .header { background-color: $color; color: white; padding: 15px; border-radius: 5px; }
+                    .content { background-color: #f9f9f9; padding: 20px; border-radius: 5px; margin-top: 20px; }
+                    .data { background-color: #2c3e50; color: white; padding: 10px; border-radius: 3px; font-family: monospace; }
+                </style>
+            </head>
+            <body>
+                <div class="container">
+                    <div class="header">
+                        <h2>$title</h2>
+                    </div>
+                    <div class="content">
+                        <p>$message</p>
+                        <p><strong>Time:</strong> $time</p>
+                        <p><strong>Priority:</strong> $priority</p>
+                    </div>
+            $data_block
+                </div>
+            </body>
+            </html>
+            """)
+
+_EMAIL_HTML_DATA = string.Template("""
+                    <div class="content">
+                        <h3>Data:</h3>
+                        <div class="data">
+                            $data
+                        </div>
+                    </div>
+                """)
+
+_EMAIL_TEXT = string.Template("$title\n\n$message\n\nTime: $time\nPriority: $priority")
+
+# Interval (seconden) van de NOOP keepalive op de open SMTP verbinding
+SMTP_KEEPALIVE = 240
+
+def _next_at(hour: int, minute: int, weekday: Optional[int] = None) -> float:
+    """Eerstvolgende tijdstip (epoch) op hh:mm, bij weekday alleen op die dag (0 = maandag)"""
+    now = datetime.now()
+    target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if weekday is not None:
+        target += timedelta(days=(weekday - now.weekday()) % 7)
+    if target <= now:
+        target += timedelta(days=1 if weekday is None else 7)
+    return target.timestamp()
+
+# Kanalen: (config sectie, rate limit sleutel, batchbaar)
+_CHANNELS = (
+    ('telegram', 'telegram', True),
+    ('email', 'email', False),
+    ('pushover', 'push', False),
+    ('discord', 'discord', True),
+    ('slack', 'slack', False)
+)
+
+class TokenBucket:
+    """Thread-safe token bucket; try_acquire() geeft direct True/False terug"""
+    
+    def __init__(self, rate: float, capacity: float = 1):
+        self.rate = rate  # tokens per seconde
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def try_acquire(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
 class NotificationType(Enum):
     TRADE = "trade"
     ALERT = "alert"
@@ -22,7 +163,32 @@ class NotificationType(Enum):
     INFO = "info"
     ARBITRAGE = "arbitrage"
 
-@dataclass
+# Opmaak per type, één keer opgebouwd i.p.v. per verzonden bericht
+_TELEGRAM_EMOJI = {
+    NotificationType.TRADE: "💰",
+    NotificationType.ALERT: "🚨",
+    NotificationType.ERROR: "❌",
+    NotificationType.INFO: "ℹ️",
+    NotificationType.ARBITRAGE: "🔄"
+}
+
+_DISCORD_COLORS = {
+    NotificationType.TRADE: 0x00ff00,  # Green
+    NotificationType.ALERT: 0xff9900,  # Orange
+    NotificationType.ERROR: 0xff0000,  # Red
+    NotificationType.INFO: 0x0099ff,   # Blue
+    NotificationType.ARBITRAGE: 0x9900ff  # Purple
+}
+
+_SLACK_EMOJI = {
+    NotificationType.TRADE: ":moneybag:",
+    NotificationType.ALERT: ":rotating_light:",
+    NotificationType.ERROR: ":x:",
+    NotificationType.INFO: ":information_source:",
+    NotificationType.ARBITRAGE: ":arrows_counterclockwise:"
+}
+
+@dataclass(eq=False, slots=True)
 class Notification:
     type: NotificationType
     title: str
@@ -36,18 +202,50 @@ class NotificationManager:
     
     def __init__(self, config_path: str = "config/notifications.json"):
         self.config = self.load_config(config_path)
+        self.build_channel_map()
+        # Heap van (-priority, volgnummer, notificatie): hoogste prioriteit eerst, daarbinnen FIFO
         self.notification_queue = []
+        self._seq = 0
         self.is_running = False
-        self.history = []
+        self._scheduler_stop = None
         self.max_history = 1000
+        # deque met maxlen: de oudste valt er in O(1) af als de history vol is
+        self.history = deque(maxlen=self.max_history)
+        # Zelfde history per type (sleutel: type.value) voor gefilterde opvragingen
+        self._history_by_type = defaultdict(lambda: deque(maxlen=self.max_history))
+        self.session = _make_http_session()
+        # Eén ingelogde SMTP verbinding voor alle emails
+        self._smtp = None
+        self._smtp_lock = threading.Lock()
+        # Kanalen parallel versturen: totale latency = traagste kanaal i.p.v. de som
+        self.executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='notify')
+        
+        # Batching voor Telegram en Discord
+        self._pending = defaultdict(list)
+        self._pending_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._flush_task = threading.Thread(target=self._flush_loop, daemon=True)
+        self._flush_task.start()
+        
+        # Dispatcher thread: add_notification zet alleen in de queue en blokkeert
+        # de aanroeper nooit op HTTP/SMTP; versturen gebeurt hier
+        self._queue_lock = threading.Lock()
+        self._drain_requested = threading.Event()
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, daemon=True)
+        self._dispatcher.start()
         
         # Rate limiting
-        self.last_sent = {}
         self.rate_limits = {
             'telegram': 1,  # seconden tussen berichten
             'email': 60,    # seconden tussen emails
-            'push': 1       # seconden tussen pushes
+            'push': 1,      # seconden tussen pushes
+            'discord': 0.5, # webhook: 5 requests per 2 seconden
+            'slack': 1      # webhook: 1 bericht per seconde
         }
+        self._buckets = {channel: TokenBucket(1 / interval) for channel, interval in self.rate_limits.items()}
+        
+        # Duplicaat onderdrukking: hash(type, titel, bericht) -> laatste tijdstip
+        self._recent = {}
         
     def load_config(self, config_path: str) -> dict:
         """Laad notificatie configuratie"""
@@ -77,12 +275,14 @@ class NotificationManager:
             "discord": {
                 "enabled": False,
                 "webhook_url": "",
+                "compress": False,  # grote payloads gzip versturen
                 "notify_on": ["trade", "alert"]
             },
             "slack": {
                 "enabled": False,
                 "webhook_url": "",
                 "channel": "#trading",
+                "compress": False,  # grote payloads gzip versturen
                 "notify_on": ["alert", "arbitrage"]
             },
             "settings": {
@@ -104,6 +304,22 @@ class NotificationManager:
             logger.warning(f"Config file {config_path} not found, using defaults")
             return default_config
     
+    def build_channel_map(self):
+        """Per notificatie type de actieve kanalen; opnieuw aanroepen na een config wijziging"""
+        self._channels_for = {ntype: [] for ntype in NotificationType}
+        for channel, rate_key, batchable in _CHANNELS:
+            config = self.config[channel]
+            if not config['enabled']:
+                continue
+            sender = getattr(self, f"send_{channel}")
+            for value in frozenset(config['notify_on']):
+                try:
+                    ntype = NotificationType(value)
+                except ValueError:
+                    logger.warning(f"Unknown notification type '{value}' in {channel}.notify_on")
+                    continue
+                self._channels_for[ntype].append((channel, rate_key, batchable, sender))
+    
     def save_config(self, config_path: str = "config/notifications.json"):
         """Sla configuratie op"""
         import os
@@ -113,7 +329,11 @@ class NotificationManager:
     
     def add_notification(self, ntype: NotificationType, title: str, message: str, 
                         priority: int = 1, data: dict = None):
-        """Voeg notificatie toe aan queue"""
+        """Voeg notificatie toe aan queue; None als hij als duplicaat is onderdrukt"""
+        if priority < 3 and self._is_duplicate(ntype, title, message):
+            logger.info(f"Notification suppressed (duplicate within {DEDUP_WINDOW}s): {title}")
+            return None
+        
         notification = Notification(
             type=ntype,
             title=title,
@@ -123,77 +343,175 @@ class NotificationManager:
             data=data or {}
         )
         
-        self.notification_queue.append(notification)
+        with self._queue_lock:
+            heapq.heappush(self.notification_queue, (-priority, self._seq, notification))
+            self._seq += 1
+            
+            # Beperk queue grootte: de oudste met de laagste prioriteit valt af
+            if len(self.notification_queue) > self.config['settings']['max_queue_size']:
+                lowest = max(self.notification_queue, key=lambda entry: (entry[0], -entry[1]))
+                self.notification_queue.remove(lowest)
+                heapq.heapify(self.notification_queue)
         
-        # Beperk queue grootte
-        if len(self.notification_queue) > self.config['settings']['max_queue_size']:
-            self.notification_queue.pop(0)
-        
-        # Verstuur direct voor hoge prioriteit
+        # Hoge prioriteit: dispatcher direct de queue laten legen
         if priority >= 3:
-            self.process_queue()
+            self._drain_requested.set()
         
         return notification
     
+    def _is_duplicate(self, ntype: NotificationType, title: str, message: str) -> bool:
+        """True als dezelfde notificatie binnen DEDUP_WINDOW al is doorgelaten"""
+        now = time.monotonic()
+        key = hash((ntype, title, message))
+        if now - self._recent.get(key, -DEDUP_WINDOW) < DEDUP_WINDOW:
+            return True
+        self._recent[key] = now
+        
+        # Verlopen entries opruimen zodat de dict niet blijft groeien
+        if len(self._recent) > 1000:
+            self._recent = {k: t for k, t in self._recent.items() if now - t < DEDUP_WINDOW}
+        
+        return False
+    
+    def _dispatch_loop(self):
+        """Leeg de queue telkens als add_notification daarom vraagt"""
+        while True:
+            self._drain_requested.wait()
+            if self._stop_event.is_set():
+                return
+            self._drain_requested.clear()
+            self.process_queue()
+    
     def process_queue(self):
         """Verwerk notificatie queue"""
-        for notification in list(self.notification_queue):
+        while True:
+            with self._queue_lock:
+                if not self.notification_queue:
+                    return
+                entry = heapq.heappop(self.notification_queue)
+            notification = entry[2]
             try:
                 self.send_notification(notification)
-                self.notification_queue.remove(notification)
                 
                 # Bewaar in history
                 self.history.append(notification)
-                if len(self.history) > self.max_history:
-                    self.history.pop(0)
-                    
-                time.sleep(0.1)  # Prevent rate limiting
+                self._history_by_type[notification.type.value].append(notification)
                 
             except Exception as e:
                 logger.error(f"Error sending notification: {str(e)}")
+                # Terug in de queue op dezelfde plek; volgende process_queue probeert opnieuw
+                with self._queue_lock:
+                    heapq.heappush(self.notification_queue, entry)
+                break
     
     def send_notification(self, notification: Notification):
-        """Verstuur notificatie via alle geconfigureerde kanalen"""
+        """Verstuur notificatie via alle geconfigureerde kanalen (parallel)"""
         
         # Check rate limiting
         current_time = time.time()
+        senders = []
+        batch = notification.priority < 3
         
-        # Telegram
-        if self.config['telegram']['enabled'] and notification.type.value in self.config['telegram']['notify_on']:
-            if self.check_rate_limit('telegram', current_time):
-                self.send_telegram(notification)
-                self.last_sent['telegram'] = current_time
+        for channel, rate_key, batchable, send in self._channels_for[notification.type]:
+            if batch and batchable:
+                self._add_pending(channel, notification)
+            elif self.check_rate_limit(rate_key, current_time):
+                senders.append(send)
+            else:
+                # Kanaal zit aan zijn limiet: met de volgende flush mee i.p.v. wegvallen
+                self._add_pending(channel, notification)
         
-        # Email
-        if self.config['email']['enabled'] and notification.type.value in self.config['email']['notify_on']:
-            if self.check_rate_limit('email', current_time):
-                self.send_email(notification)
-                self.last_sent['email'] = current_time
-        
-        # Pushover
-        if self.config['pushover']['enabled'] and notification.type.value in self.config['pushover']['notify_on']:
-            if self.check_rate_limit('push', current_time):
-                self.send_pushover(notification)
-                self.last_sent['push'] = current_time
+        futures = [self.executor.submit(send, notification) for send in senders]
+        _, not_done = wait(futures, timeout=SEND_TIMEOUT)
+        for future in not_done:
+            future.cancel()
+    
+    def _add_pending(self, channel: str, notification: Notification):
+        """Zet notificatie klaar voor de volgende flush van dit kanaal"""
+        with self._pending_lock:
+            self._pending[channel].append(notification)
+            self._trim_pending(channel)
+    
+    def _trim_pending(self, channel: str):
+        """Houd de wachtrij van een kanaal onder MAX_PENDING (aanroepen met _pending_lock)"""
+        waiting = self._pending[channel]
+        overflow = len(waiting) - MAX_PENDING
+        if overflow > 0:
+            del waiting[:overflow]
+            logger.warning(f"Pending queue for {channel} full, dropped {overflow} oldest notification(s)")
+    
+    def _flush_loop(self):
+        """Verstuur elke BATCH_INTERVAL seconden de verzamelde notificaties"""
+        while not self._stop_event.wait(BATCH_INTERVAL):
+            self.flush_pending()
+    
+    def flush_pending(self):
+        """Verstuur alle verzamelde notificaties: één bericht per batch kanaal,
+        de overige kanalen één voor één zolang hun rate limit het toelaat"""
+        with self._pending_lock:
+            pending, self._pending = self._pending, defaultdict(list)
         
-        # Discord
-        if self.config['discord']['enabled'] and notification.type.value in self.config['discord']['notify_on']:
-            self.send_discord(notification)
+        current_time = time.time()
+        for channel, send_batch in (('telegram', self._send_telegram_batch),
+                                    ('discord', self._send_discord_batch)):
+            if not pending[channel]:
+                continue
+            if not self.check_rate_limit(channel, current_time):
+                # Geen token: terug voor de volgende flush, vóór wat er intussen bij kwam
+                with self._pending_lock:
+                    self._pending[channel][:0] = pending[channel]
+                    self._trim_pending(channel)
+                continue
+            send_batch(pending[channel])
         
-        # Slack
-        if self.config['slack']['enabled'] and notification.type.value in self.config['slack']['notify_on']:
-            self.send_slack(notification)
+        for channel, rate_key, batchable in _CHANNELS:
+            waiting = pending[channel]
+            if batchable or not waiting:
+                continue
+            send = getattr(self, f"send_{channel}")
+            sent = 0
+            while sent < len(waiting) and self.check_rate_limit(rate_key, current_time):
+                # Via de executor: een trage SMTP login houdt de batches niet op
+                try:
+                    self.executor.submit(send, waiting[sent])
+                except RuntimeError:
+                    # Executor is al gestopt (stop()); niets meer te versturen
+                    return
+                sent += 1
+            if sent < len(waiting):
+                with self._pending_lock:
+                    self._pending[channel][:0] = waiting[sent:]
+                    self._trim_pending(channel)
+    
+    def _post_webhook(self, channel: str, url: str, payload: dict):
+        """POST een JSON payload; met compress aan gaan grote bodies gzip over de lijn"""
+        body = _dumps(payload)
+        if self.config[channel].get('compress') and len(body) > GZIP_MIN_SIZE:
+            return self.session.post(url, data=gzip.compress(body), headers=_GZIP_JSON_HEADERS, timeout=10)
+        return self.session.post(url, data=body, headers=_JSON_HEADERS, timeout=10)
     
     def check_rate_limit(self, channel: str, current_time: float) -> bool:
-        """Controleer rate limiting"""
-        if channel not in self.last_sent:
-            return True
-        
-        time_since_last = current_time - self.last_sent.get(channel, 0)
-        return time_since_last >= self.rate_limits.get(channel, 1)
+        """Controleer rate limiting; verbruikt een token als het kanaal vrij is"""
+        bucket = self._buckets.get(channel)
+        return bucket is None or bucket.try_acquire()
     
     def send_telegram(self, notification: Notification):
         """Verstuur Telegram bericht"""
+        return self._send_telegram_batch([notification])
+    
+    def _telegram_text(self, notification: Notification) -> str:
+        """Format één notificatie als Telegram (Markdown) tekst"""
+        emoji = _TELEGRAM_EMOJI.get(notification.type, "📢")
+        
+        message = f"{emoji} *{notification.title}*\n\n{notification.message}"
+        
+        if notification.data:
+            message += f"\n\n`{_format_data(notification.data)}`"
+        
+        return message
+    
+    def _send_telegram_batch(self, notifications: List[Notification]):
+        """Verstuur notificaties samengevoegd in zo min mogelijk Telegram berichten"""
         try:
             bot_token = self.config['telegram']['bot_token']
             chat_id = self.config['telegram']['chat_id']
@@ -201,34 +519,31 @@ class NotificationManager:
             if not bot_token or not chat_id:
                 return
             
-            # Format bericht
-            emoji = {
-                NotificationType.TRADE: "💰",
-                NotificationType.ALERT: "🚨",
-                NotificationType.ERROR: "❌",
-                NotificationType.INFO: "ℹ️",
-                NotificationType.ARBITRAGE: "🔄"
-            }.get(notification.type, "📢")
-            
-            message = f"{emoji} *{notification.title}*\n\n{notification.message}"
-            
-            if notification.data:
-                message += f"\n\n`{json.dumps(notification.data, indent=2)}`"
+            # Samenvoegen zolang een bericht onder de Telegram limiet blijft
+            messages = []
+            for text in map(self._telegram_text, notifications):
+                if messages and len(messages[-1]) + len(TELEGRAM_SEPARATOR) + len(text) <= TELEGRAM_MAX_LENGTH:
+                    messages[-1] += TELEGRAM_SEPARATOR + text
+                else:
+                    messages.append(text)
             
             url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-            payload = {
-                'chat_id': chat_id,
-                'text': message,
-                'parse_mode': 'Markdown',
-                'disable_web_page_preview': True
-            }
-            
-            response = requests.post(url, json=payload, timeout=10)
-            
-            if response.status_code != 200:
-                logger.error(f"Telegram error: {response.text}")
+            success = True
+            for message in messages:
+                payload = {
+                    'chat_id': chat_id,
+                    'text': message,
+                    'parse_mode': 'Markdown',
+                    'disable_web_page_preview': True
+                }
+                
+                response = self.session.post(url, data=_dumps(payload), headers=_JSON_HEADERS, timeout=10)
+                
+                if response.status_code != 200:
+                    logger.error(f"Telegram error: {response.text}")
+                    success = False
             
-            return response.status_code == 200
+            return success
             
         except Exception as e:
             logger.error(f"Telegram send error: {str(e)}")
@@ -248,74 +563,42 @@ class NotificationManager:
             msg['From'] = config['sender']
             msg['To'] = ', '.join(config['recipients'])
             
-            # Prioriteit kleur
-            priority_colors = {
-                1: "#3498db",  # Blue
-                2: "#f39c12",  # Orange
-                3: "#e74c3c",  # Red
-                4: "#8e44ad"   # Purple
-            }
-            
-            color = priority_colors.get(notification.priority, "#3498db")
+            data = _format_data(notification.data) if notification.data else None
             
             # HTML content
-            html = f"""
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <style>
-                    body {{ font-family: Arial, sans-serif; }}
-                    .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                    .header {{ background-color: {color}; color: white; padding: 15px; border-radius: 5px; }}
-                    .content {{ background-color: #f9f9f9; padding: 20px; border-radius: 5px; margin-top: 20px; }}
-                    .data {{ background-color: #2c3e50; color: white; padding: 10px; border-radius: 3px; font-family: monospace; }}
-                </style>
-            </head>
-            <body>
-                <div class="container">
-                    <div class="header">
-                        <h2>{notification.title}</h2>
-                    </div>
-                    <div class="content">
-                        <p>{notification.message}</p>
-                        <p><strong>Time:</strong> {notification.timestamp.strftime('%Y-%m-%d %H:%M:%S')}</p>
-                        <p><strong>Priority:</strong> {notification.priority}</p>
-                    </div>
-            """
-            
-            if notification.data:
-                html += f"""
-                    <div class="content">
-                        <h3>Data:</h3>
-                        <div class="data">
-                            {json.dumps(notification.data, indent=2)}
-                        </div>
-                    </div>
-                """
-            
-            html += """
-                </div>
-            </body>
-            </html>
-            """
+            html = _EMAIL_HTML.substitute(
+                color=_PRIORITY_COLORS.get(notification.priority, "#3498db"),
+                title=notification.title,
+                message=notification.message,
+                time=notification.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
+                priority=notification.priority,
+                data_block=_EMAIL_HTML_DATA.substitute(data=data) if data else ""
+            )
             
             # Plain text versie
-            text = f"{notification.title}\n\n{notification.message}\n\nTime: {notification.timestamp}\nPriority: {notification.priority}"
+            text = _EMAIL_TEXT.substitute(
+                title=notification.title,
+                message=notification.message,
+                time=notification.timestamp,
+                priority=notification.priority
+            )
             
-            if notification.data:
-                text += f"\n\nData:\n{json.dumps(notification.data, indent=2)}"
+            if data:
+                text += f"\n\nData:\n{data}"
             
             # Voeg beide versies toe
-            part1 = MIMEText(text, 'plain')
-            part2 = MIMEText(html, 'html')
+            part1 = MIMEText(text, 'plain', 'utf-8')
+            part2 = MIMEText(html, 'html', 'utf-8')
             msg.attach(part1)
             msg.attach(part2)
             
-            # Verstuur email
-            with smtplib.SMTP(config['smtp_server'], config['smtp_port']) as server:
-                server.starttls()
-                server.login(config['username'], config['password'])
-                server.send_message(msg)
+            # Verstuur email over de open verbinding; bij een verbroken verbinding één keer opnieuw
+            with self._smtp_lock:
+                try:
+                    self._get_smtp().send_message(msg)
+                except smtplib.SMTPServerDisconnected:
+                    self._close_smtp()
+                    self._get_smtp().send_message(msg)
             
             return True
             
@@ -323,6 +606,43 @@ class NotificationManager:
             logger.error(f"Email send error: {str(e)}")
             return False
     
+    def _get_smtp(self) -> smtplib.SMTP:
+        """Open (of hergebruik) de ingelogde SMTP verbinding; aanroeper houdt _smtp_lock vast"""
+        if self._smtp is not None:
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._close_smtp()
+        
+        config = self.config['email']
+        server = smtplib.SMTP(config['smtp_server'], config['smtp_port'], timeout=30)
+        server.starttls()
+        server.login(config['username'], config['password'])
+        self._smtp = server
+        return server
+    
+    def _close_smtp(self):
+        """Sluit de SMTP verbinding als die open is"""
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+        self._smtp = None
+    
+    def _smtp_keepalive(self):
+        """NOOP op een open verbinding zodat de server hem niet wegens inactiviteit sluit"""
+        with self._smtp_lock:
+            if self._smtp is None:
+                return
+            try:
+                self._smtp.noop()
+            except (smtplib.SMTPException, OSError):
+                self._close_smtp()
+    
     def send_pushover(self, notification: Notification):
         """Verstuur Pushover notificatie"""
         try:
@@ -338,7 +658,7 @@ class NotificationManager:
                 "timestamp": int(notification.timestamp.timestamp())
             }
             
-            response = requests.post(url, data=payload, timeout=10)
+            response = self.session.post(url, data=payload, timeout=10)
             return response.status_code == 200
             
         except Exception as e:
@@ -347,45 +667,49 @@ class NotificationManager:
     
     def send_discord(self, notification: Notification):
         """Verstuur Discord webhook"""
+        return self._send_discord_batch([notification])
+    
+    def _discord_embed(self, notification: Notification) -> dict:
+        """Discord embed voor één notificatie"""
+        embed = {
+            "title": notification.title,
+            "description": notification.message,
+            "color": _DISCORD_COLORS.get(notification.type, 0x0099ff),
+            "timestamp": notification.timestamp.isoformat(),
+            "fields": []
+        }
+        
+        if notification.data:
+            for key, value in notification.data.items():
+                if isinstance(value, (dict, list)):
+                    value = _format_data(value)[:1024]
+                embed["fields"].append({
+                    "name": key,
+                    "value": str(value)[:1024],
+                    "inline": True
+                })
+        
+        return embed
+    
+    def _send_discord_batch(self, notifications: List[Notification]):
+        """Verstuur notificaties als embeds, DISCORD_MAX_EMBEDS per webhook call"""
         try:
             webhook_url = self.config['discord']['webhook_url']
             
             if not webhook_url:
                 return False
             
-            # Kies kleur gebaseerd op type
-            colors = {
-                NotificationType.TRADE: 0x00ff00,  # Green
-                NotificationType.ALERT: 0xff9900,  # Orange
-                NotificationType.ERROR: 0xff0000,  # Red
-                NotificationType.INFO: 0x0099ff,   # Blue
-                NotificationType.ARBITRAGE: 0x9900ff  # Purple
-            }
-            
-            embed = {
-                "title": notification.title,
-                "description": notification.message,
-                "color": colors.get(notification.type, 0x0099ff),
-                "timestamp": notification.timestamp.isoformat(),
-                "fields": []
-            }
-            
-            if notification.data:
-                for key, value in notification.data.items():
-                    if isinstance(value, (dict, list)):
-                        value = json.dumps(value, indent=2)[:1024]
-                    embed["fields"].append({
-                        "name": key,
-                        "value": str(value)[:1024],
-                        "inline": True
-                    })
-            
-            payload = {
-                "embeds": [embed]
-            }
+            embeds = [self._discord_embed(n) for n in notifications]
+            success = True
+            for i in range(0, len(embeds), DISCORD_MAX_EMBEDS):
+                payload = {
+                    "embeds": embeds[i:i + DISCORD_MAX_EMBEDS]
+                }
+                
+                response = self._post_webhook('discord', webhook_url, payload)
+                success = success and response.status_code == 204
             
-            response = requests.post(webhook_url, json=payload, timeout=10)
-            return response.status_code == 204
+            return success
             
         except Exception as e:
             logger.error(f"Discord send error: {str(e)}")
@@ -400,15 +724,7 @@ class NotificationManager:
                 return False
             
             # Kies emoji gebaseerd op type
-            emojis = {
-                NotificationType.TRADE: ":moneybag:",
-                NotificationType.ALERT: ":rotating_light:",
-                NotificationType.ERROR: ":x:",
-                NotificationType.INFO: ":information_source:",
-                NotificationType.ARBITRAGE: ":arrows_counterclockwise:"
-            }
-            
-            emoji = emojis.get(notification.type, ":bell:")
+            emoji = _SLACK_EMOJI.get(notification.type, ":bell:")
             
             blocks = [
                 {
@@ -441,7 +757,7 @@ class NotificationManager:
             ]
             
             if notification.data:
-                data_text = "```\n" + json.dumps(notification.data, indent=2)[:2000] + "\n```"
+                data_text = "```\n" + _format_data(notification.data)[:2000] + "\n```"
                 blocks.append({
                     "type": "section",
                     "text": {
@@ -455,7 +771,7 @@ class NotificationManager:
                 "blocks": blocks
             }
             
-            response = requests.post(webhook_url, json=payload, timeout=10)
+            response = self._post_webhook('slack', webhook_url, payload)
             return response.status_code == 200
             
         except Exception as e:
@@ -543,29 +859,40 @@ Active Strategies: {summary_data.get('active_strategies', 0)}
     
     def start_scheduler(self):
         """Start geplande notificaties"""
-        # Dagelijks om 18:00
-        schedule.every().day.at("18:00").do(
-            self.send_daily_summary,
-            {'note': 'Automatic daily summary'}
-        )
-        
-        # Wekelijkse samenvatting op zondag
-        schedule.every().sunday.at("20:00").do(
-            lambda: self.add_notification(
-                NotificationType.INFO,
-                "Weekly Summary",
-                "Weekly trading summary will be sent shortly...",
-                priority=1
-            )
-        )
+        # Jobs als heap van (volgende run, volgnummer, job, functie die de run daarna geeft)
+        jobs = [
+            # Dagelijks om 18:00
+            (lambda: _next_at(18, 0),
+             lambda: self.send_daily_summary({'note': 'Automatic daily summary'})),
+            # Wekelijkse samenvatting op zondag
+            (lambda: _next_at(20, 0, weekday=6),
+             lambda: self.add_notification(
+                 NotificationType.INFO,
+                 "Weekly Summary",
+                 "Weekly trading summary will be sent shortly...",
+                 priority=1
+             )),
+            # Houd de SMTP verbinding open tussen emails door
+            (lambda: time.time() + SMTP_KEEPALIVE, self._smtp_keepalive)
+        ]
+        heap = [(next_run(), seq, job, next_run) for seq, (next_run, job) in enumerate(jobs)]
+        heapq.heapify(heap)
         
         self.is_running = True
+        self._scheduler_stop = threading.Event()
+        stop_event = self._scheduler_stop
         
-        # Start scheduler in aparte thread
+        # Start scheduler in aparte thread; slaapt precies tot de eerstvolgende job
         def run_scheduler():
-            while self.is_running:
-                schedule.run_pending()
-                time.sleep(60)  # Check elke minuut
+            while True:
+                next_ts, seq, job, next_run = heap[0]
+                if stop_event.wait(timeout=max(0, next_ts - time.time())):
+                    return
+                heapq.heapreplace(heap, (next_run(), seq, job, next_run))
+                try:
+                    job()
+                except Exception as e:
+                    logger.error(f"Scheduled job error: {str(e)}")
         
         thread = threading.Thread(target=run_scheduler, daemon=True)
         thread.start()
@@ -573,19 +900,35 @@ Active Strategies: {summary_data.get('active_strategies', 0)}
     def stop_scheduler(self):
         """Stop de scheduler"""
         self.is_running = False
+        if self._scheduler_stop is not None:
+            self._scheduler_stop.set()
+    
+    def stop(self):
+        """Stop de scheduler en de verzend threads; verstuurt eerst wat nog in een batch wacht"""
+        self.stop_scheduler()
+        self._stop_event.set()
+        self._drain_requested.set()
+        self.flush_pending()
+        self.executor.shutdown(wait=False)
+        with self._smtp_lock:
+            self._close_smtp()
     
     def get_notification_history(self, limit: int = 50, ntype: str = None):
         """Haal notificatie geschiedenis op"""
-        history = self.history
+        history = self._history_by_type.get(ntype, ()) if ntype else self.history
         
-        if ntype:
-            history = [n for n in history if n.type.value == ntype]
+        if not limit:
+            return list(history)
         
-        return history[-limit:] if limit else history
+        # Alleen de laatste limit items lopen, vanaf het eind
+        recent = list(islice(reversed(history), limit))
+        recent.reverse()
+        return recent
     
     def clear_history(self):
         """Wis notificatie geschiedenis"""
         self.history.clear()
+        self._history_by_type.clear()
     
     def test_all_channels(self):
         """Test alle geconfigureerde notificatiekanalen"""
@@ -1,28 +1,48 @@
 import os
 import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# apt-get update is traag (netwerk); de uitkomst blijft zo lang geldig (seconden)
+UPDATE_CHECK_TTL = 3600
 
 class SecurityAudit:
+    def __init__(self):
+        self._last_update_check = None  # (tijdstip, resultaat)
+    
     def check_vps_security(self):
-        checks = {
-            'firewall_active': self.check_firewall(),
-            'updates_current': self.check_updates(),
-            'backup_system': self.check_backups()
-        }
+        # Onafhankelijke checks tegelijk; totale duur = traagste check (apt-get update)
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = {
+                'firewall_active': executor.submit(self.check_firewall),
+                'updates_current': executor.submit(self.check_updates),
+                'backup_system': executor.submit(self.check_backups)
+            }
+            checks = {name: future.result(timeout=180) for name, future in futures.items()}
         return checks
     
     def check_firewall(self):
         try:
-            result = subprocess.run(['sudo', 'ufw', 'status'], capture_output=True, text=True)
-            return 'active' in result.stdout.lower()
-        except:
+            result = subprocess.run(['sudo', 'ufw', 'status'], capture_output=True, text=True, timeout=5)
+            return 'status: active' in result.stdout.lower()
+        except (subprocess.SubprocessError, OSError):
             return False
     
     def check_updates(self):
+        if self._last_update_check is not None:
+            checked_at, result = self._last_update_check
+            if time.time() - checked_at < UPDATE_CHECK_TTL:
+                return result
+        
         try:
-            subprocess.run(['sudo', 'apt-get', 'update'], capture_output=True)
-            return True
-        except:
-            return False
+            completed = subprocess.run(['sudo', 'apt-get', 'update'], capture_output=True,
+                                       check=False, timeout=120)
+            result = completed.returncode == 0
+        except (subprocess.SubprocessError, OSError):
+            result = False
+        
+        self._last_update_check = (time.time(), result)
+        return result
     
     def check_backups(self):
         return os.path.exists('/opt/grid_trading_bot/backups')
\ No newline at end of file